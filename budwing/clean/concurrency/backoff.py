@@ -0,0 +1,86 @@
+import abc
+import random
+import threading
+
+
+class BackoffPolicy(abc.ABC):
+    """
+    How long to wait before the next retry, and when to stop retrying.
+
+    Budgets end the retrying: max_retries attempts, or max_wait seconds of
+    total waiting, whichever comes first (None means no limit).
+    Subclasses decide the delay.
+    """
+    def __init__(self, max_retries=None, max_wait=None):
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+
+    @abc.abstractmethod
+    def delay(self, attempt) -> float:
+        ...
+
+    def allows(self, attempt, waited) -> bool:
+        if self.max_retries is not None and attempt >= self.max_retries:
+            return False
+        if self.max_wait is not None and waited >= self.max_wait:
+            return False
+        return True
+
+
+class ExponentialBackoff(BackoffPolicy):
+    """
+    Exponential backoff with full jitter, for retry loops around try-locks.
+
+    The n-th retry waits a random time between 0 and min(cap, base * 2**n).
+    - exponential: the more often a thread lost, the longer it stays away,
+      so a crowd of contenders thins out quickly
+    - full jitter: two threads that failed together don't come back
+      together, which is what makes symmetric retries livelock
+    - cap: a single wait never becomes absurdly long
+    """
+    def __init__(self, base=0.001, cap=0.1, max_retries=None, max_wait=None, jitter=True):
+        super().__init__(max_retries, max_wait)
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+
+    def delay(self, attempt) -> float:
+        ceiling = min(self.cap, self.base * 2 ** attempt)
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+
+class UniformBackoff(BackoffPolicy):
+    """
+    A random wait between low and high on every retry, whatever the attempt:
+    the original strategy of the dead_lock.py try-lock examples.
+    """
+    def __init__(self, low=0.001, high=1, max_retries=None, max_wait=None):
+        super().__init__(max_retries, max_wait)
+        self.low = low
+        self.high = high
+
+    def delay(self, attempt) -> float:
+        return random.uniform(self.low, self.high)
+
+
+class ContentionStats:
+    """
+    Thread-safe counters filled by the try-lock transfers.
+    """
+    def __init__(self):
+        self.transfers = 0
+        self.retries = 0
+        self.acquisitions = 0
+        self.wait_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, transferred=False, retries=0, acquisitions=0, wait_time=0.0):
+        with self._lock:
+            self.transfers += transferred
+            self.retries += retries
+            self.acquisitions += acquisitions
+            self.wait_time += wait_time
+
+    def __repr__(self):
+        return (f"ContentionStats(transfers={self.transfers}, retries={self.retries}, "
+                f"acquisitions={self.acquisitions}, wait_time={self.wait_time:.3f}s)")
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+async def time_sliced(iterable, time_slice=0.005, initial_chunk=1000):
+    """
+    Splits a CPU-bound loop into chunks and gives the event loop a turn
+    every `time_slice` seconds, however fast the machine is.
+
+        async for chunk in time_sliced(range(n)):
+            for i in chunk:
+                total += i * i
+
+    Yielding every N iterations (like starvation.cpu_bound_task) stalls
+    the loop for as long as N iterations take, which depends on the CPU.
+    Here the clock is read once per chunk, not once per item, and the
+    chunk size adapts so that a chunk takes about a quarter of the slice:
+    the stall stays near time_slice and the clock costs nothing.
+    A range is cut with range slicing, other iterables with islice.
+
+    A coroutine waiting on a timer needs two turns of the loop to resume,
+    so its lag can reach two or three slices: bounded, whatever the CPU.
+    """
+    if isinstance(iterable, range):
+        def chunks(size):
+            nonlocal iterable
+            chunk, iterable = iterable[:size], iterable[size:]
+            return chunk
+    else:
+        iterator = iter(iterable)
+
+        def chunks(size):
+            return list(itertools.islice(iterator, size))
+
+    size = initial_chunk
+    slice_start = time.perf_counter()
+    while chunk := chunks(size):
+        chunk_start = time.perf_counter()
+        yield chunk  # the caller runs the chunk before we come back here
+        now = time.perf_counter()
+        if now - chunk_start > 0:  # at most double, a short chunk is a noisy estimate
+            size = max(1, min(size * 2, int(size * time_slice / 4 / (now - chunk_start))))
+        if now - slice_start >= time_slice:
+            await asyncio.sleep(0)
+            slice_start = time.perf_counter()
+
+
+async def _sum_of_squares_counted(n, every):
+    total = 0
+    for i in range(n):
+        total += i * i
+        if i % every == 0:
+            await asyncio.sleep(0)
+    return total
+
+
+async def _sum_of_squares_sliced(n, time_slice):
+    total = 0
+    async for chunk in time_sliced(range(n), time_slice):
+        for i in chunk:
+            total += i * i
+    return total
+
+
+async def _measure(work):
+    """Runs the work next to a 1ms timer, returns (seconds, worst timer lag)."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    task = asyncio.create_task(work)
+    start = time.perf_counter()
+    while not task.done():
+        expected = loop.time() + 0.001
+        await asyncio.sleep(0.001)
+        worst = max(worst, loop.time() - expected)
+    await task
+    return time.perf_counter() - start, worst
+
+
+async def benchmark(n=20_000_000):
+    for name, work in (
+        ("yield every 1,000,000 items", _sum_of_squares_counted(n, 1_000_000)),
+        ("yield every 5ms            ", _sum_of_squares_sliced(n, 0.005)),
+        ("yield every 1ms            ", _sum_of_squares_sliced(n, 0.001)),
+    ):
+        elapsed, lag = await _measure(work)
+        logger.info(f"{name}: {elapsed:.2f}s, worst heartbeat lag {lag * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    asyncio.run(benchmark())
@@ -1,12 +1,20 @@
 import asyncio
-import random
 import threading
 import time
 
 import logging
 
+from budwing.clean.concurrency.backoff import BackoffPolicy, ContentionStats, ExponentialBackoff, UniformBackoff
+from budwing.clean.concurrency.keyed_lock import AsyncKeyedLock
+from budwing.clean.concurrency.striped_lock import StripedLocks
+
 logger = logging.getLogger(__name__)
 
+# coroutine locks by user name, created only while a user is being saved
+async_user_locks = AsyncKeyedLock()
+# thread locks by user name, a fixed number of them for any number of users
+account_locks = StripedLocks()
+
 class User:
     """
     A simple class to represent a user with a balance.
@@ -14,29 +22,41 @@ class User:
     name: str
     balance: float
     _lock: threading.Lock
-    _async_lock: asyncio.Lock
 
     def __init__(self, name, balance = 0):
         self.name = name
         self.balance = balance
         self._lock = threading.Lock()
-        self._async_lock = asyncio.Lock()
 
-def transfer_try_lock(source: User, target: User, amount: float):
+def _transfer_with_retries(source: User, target: User, amount: float, acquire,
+                           backoff: BackoffPolicy, stats: ContentionStats, work_time: float) -> bool:
     """
-    By using acquire(blocking=False) with a backoff strategy, we can avoid deadlock.
+    The retry loop shared by the try-lock transfers: get both locks or release
+    the first one, then back off as the policy says.
+    Returns False when the policy's retry budget is exhausted.
     """
+    stats = stats or ContentionStats()
+    attempt = acquisitions = 0
+    waited = 0.0
     while True:
-        if source._lock.acquire(blocking=False):
+        start = time.perf_counter()
+        got_source = acquire(source._lock)
+        waited += time.perf_counter() - start
+        if got_source:
+            acquisitions += 1
             try:
                 logger.info(f"{threading.current_thread().name}: got {source.name}'s lock")
-                time.sleep(0.1)
-                if target._lock.acquire(blocking=False):
+                start = time.perf_counter()
+                got_target = acquire(target._lock)
+                waited += time.perf_counter() - start
+                if got_target:
+                    acquisitions += 1
                     try:
                         logger.info(f"{threading.current_thread().name}: got {target.name}'s lock")
-                        time.sleep(0.1)
+                        time.sleep(work_time)
                         logger.info(f"{threading.current_thread().name}: transferred {amount} from {source.name} to {target.name}")
-                        break
+                        stats.record(True, attempt, acquisitions, waited)
+                        return True
                     finally:
                         target._lock.release()
                 else:
@@ -46,35 +66,39 @@ def transfer_try_lock(source: User, target: User, amount: float):
                 logger.info(f"{threading.current_thread().name}: released {source.name}'s lock")
         else:
             logger.info(f"{threading.current_thread().name}: failed to get {source.name}'s lock")
-        
-        time.sleep(random.uniform(0.001, 1))
 
-def transfer_lock_timeout(source: User, target: User, amount: float):
+        if not backoff.allows(attempt, waited):
+            stats.record(False, attempt, acquisitions, waited)
+            return False
+        delay = backoff.delay(attempt)
+        time.sleep(delay)
+        waited += delay
+        attempt += 1
+
+def transfer_try_lock(source: User, target: User, amount: float,
+                      backoff: BackoffPolicy = None, stats: ContentionStats = None,
+                      work_time: float = 0.1) -> bool:
+    """
+    By using acquire(blocking=False) with a backoff strategy, we can avoid deadlock.
+    The first lock is not held while waiting for anything but the second one,
+    and the backoff is exponential with full jitter (see backoff.py), so
+    crossing transfers don't keep colliding.
+    """
+    return _transfer_with_retries(
+        source, target, amount, lambda lock: lock.acquire(blocking=False),
+        backoff or ExponentialBackoff(), stats, work_time,
+    )
+
+def transfer_lock_timeout(source: User, target: User, amount: float,
+                          backoff: BackoffPolicy = None, stats: ContentionStats = None,
+                          work_time: float = 0.1, lock_timeout: float = 0.1) -> bool:
     """
     By using acquire(timeout=x), we can avoid deadlock.
     """
-    while True:
-        if source._lock.acquire(timeout=0.1):
-            try:
-                logger.info(f"{threading.current_thread().name}: got {source.name}'s lock")
-                time.sleep(0.1)
-                if target._lock.acquire(timeout=0.1):
-                    try:
-                        logger.info(f"{threading.current_thread().name}: got {target.name}'s lock")
-                        time.sleep(0.1)
-                        logger.info(f"{threading.current_thread().name}: transferred {amount} from {source.name} to {target.name}")
-                        break
-                    finally:
-                        target._lock.release()
-                else:
-                    logger.info(f"{threading.current_thread().name}: failed to get {target.name}'s lock")
-            finally:
-                source._lock.release()
-                logger.info(f"{threading.current_thread().name}: released {source.name}'s lock")
-        else:
-            logger.info(f"{threading.current_thread().name}: failed to get {source.name}'s lock")
-        
-        time.sleep(random.uniform(0.001, 1))
+    return _transfer_with_retries(
+        source, target, amount, lambda lock: lock.acquire(timeout=lock_timeout),
+        backoff or ExponentialBackoff(), stats, work_time,
+    )
 
 def transfer_fix_order(source: User, target: User, amount: float):
     """
@@ -89,7 +113,35 @@ def transfer_fix_order(source: User, target: User, amount: float):
             logger.info(f"{threading.current_thread().name}: got {target.name}'s lock")
             time.sleep(0.1)
             logger.info(f"{threading.current_thread().name}: transferred {amount} from {source.name} to {target.name}")
-       
+
+def transfer_striped(source: User, target: User, amount: float) -> bool:
+    """
+    The locks come from the striped table, taken in the table's canonical order.
+    """
+    return transfer_many([(source, target, amount)])
+
+def transfer_many(moves: list[tuple[User, User, float]]) -> bool:
+    """
+    Applies several transfers atomically: all of them or none.
+    Every account involved is locked at once, in the striped table's order,
+    so any number of accounts can be locked without deadlock.
+    Returns False, and changes nothing, if a source has insufficient funds.
+    """
+    users = {user.name: user for move in moves for user in move[:2]}
+    with account_locks.locked(*users):
+        balances = {name: user.balance for name, user in users.items()}
+        for source, target, amount in moves:
+            balances[source.name] -= amount
+            balances[target.name] += amount
+        if any(balance < 0 for balance in balances.values()):
+            logger.info(f"{threading.current_thread().name}: insufficient funds, nothing transferred")
+            return False
+        time.sleep(0.1)
+        for name, balance in balances.items():
+            users[name].balance = balance
+        logger.info(f"{threading.current_thread().name}: transferred {len(moves)} moves between {len(users)} accounts")
+        return True
+
 def deadlock_example():
     alice = User("Alice", 100)
     bob = User("Bob", 100)
@@ -103,12 +155,63 @@ def deadlock_example():
     for t in threads:
         t.join()
 
+def backoff_benchmark(duration=2.0, threads_per_side=4, work_time=0.001):
+    """
+    Symmetric cross-transfers (half the threads Alice -> Bob, half Bob -> Alice)
+    for every backoff policy.
+
+    The throughput counts the transfers finished by the deadline, over the
+    duration, so a thread still asleep in a long backoff doesn't stretch
+    the clock. The livelock shows in the tail, the transfers that had to
+    retry: p99.9 and max latency, and how many transfers retried at all.
+    """
+    policies = {
+        "uniform(0.001, 1)": UniformBackoff(0.001, 1),
+        "exponential, no jitter": ExponentialBackoff(base=0.001, cap=0.1, jitter=False),
+        "exponential, full jitter": ExponentialBackoff(base=0.001, cap=0.1),
+    }
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for name, policy in policies.items():
+            alice, bob = User("Alice", 100), User("Bob", 100)
+            stats = ContentionStats()
+            finished = []  # (end, latency, retried)
+            start = time.perf_counter()
+            deadline = start + duration
+
+            def run(source, target):
+                while time.perf_counter() < deadline:
+                    own = ContentionStats()
+                    begin = time.perf_counter()
+                    transfer_try_lock(source, target, 1, policy, own, work_time)
+                    end = time.perf_counter()
+                    stats.record(own.transfers, own.retries, own.acquisitions, own.wait_time)
+                    finished.append((end, end - begin, own.retries > 0))
+
+            threads = [threading.Thread(target=run, args=(alice, bob)) for _ in range(threads_per_side)]
+            threads += [threading.Thread(target=run, args=(bob, alice)) for _ in range(threads_per_side)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            in_time = sum(end <= deadline for end, _, _ in finished)
+            latencies = sorted(latency for _, latency, _ in finished)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p999 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.999))] * 1000
+            retried = sum(r for _, _, r in finished)
+            print(f"{name:<25}: {in_time / duration:>6.0f} transfers/s, "
+                  f"p50 {p50:.1f}ms, p99.9 {p999:.1f}ms, max {latencies[-1] * 1000:.1f}ms, "
+                  f"{retried} transfers retried, {stats}")
+    finally:
+        logger.setLevel(level)
+
 async def save(user: User):
     """
     Never use threading lock in asyncio coroutine
     """
     logger.info(f"{user.name}: trying to acquire lock")
-    async with user._async_lock:  # it's a asyncio lock, will yield control to other tasks
+    async with async_user_locks.lock(user.name):  # it's a asyncio lock, will yield control to other tasks
         logger.info(f"{user.name}: got lock, saving...")
         await asyncio.sleep(1)  # yield control to other tasks, but not the lock
         logger.info(f"{user.name}: releasing lock")
@@ -124,4 +227,5 @@ if __name__ == "__main__":
         format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
     )
     # deadlock_example()
+    # backoff_benchmark()
     asyncio.run(deadlock_like_example())
@@ -0,0 +1,212 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class TrackedLock:
+    """
+    A threading.Lock that tells a DeadlockDetector who owns it and who waits for it.
+
+    The bookkeeping is kept out of any shared lock: the owner is an attribute
+    of the lock, and a blocked thread writes itself into the detector's
+    waiting table only when the lock is not free (the fast path is a plain
+    non-blocking acquire). Single assignments and dict updates are atomic,
+    so the hot path stays close to a bare Lock.
+    """
+    def __init__(self, name, detector: "DeadlockDetector"):
+        self.name = name
+        self.owner = None  # thread ident
+        self._lock = threading.Lock()
+        self._waiting = detector._waiting
+
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        if self._lock.acquire(False):
+            self.owner = threading.get_ident()
+            return True
+        if not blocking:
+            return False
+        me = threading.get_ident()
+        self._waiting[me] = self
+        try:
+            acquired = self._lock.acquire(True, timeout)
+        finally:
+            del self._waiting[me]
+        if acquired:
+            self.owner = me
+        return acquired
+
+    def release(self) -> None:
+        self.owner = None
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def __repr__(self):
+        return f"TrackedLock({self.name!r})"
+
+
+class DeadlockDetector:
+    """
+    Finds deadlocks among TrackedLocks at runtime, with a wait-for graph.
+
+    A thread waiting for a lock points to the thread owning that lock. A
+    thread waits for one lock at a time, so every thread has at most one
+    outgoing edge and a cycle is found by following the chain from each
+    waiting thread. The scan reads the tables without stopping anybody, so a
+    snapshot can be inconsistent (an owner may be in the middle of a
+    release); a cycle is reported only when two scans in a row find it, a
+    real deadlock doesn't go away.
+
+    The report names the threads and the locks of the cycle, with the stack
+    of every thread, and goes to on_deadlock (logged by default). Each
+    deadlock is reported once.
+
+        detector = DeadlockDetector()
+        lock = detector.lock("alice")
+        detector.start()
+    """
+    def __init__(self, interval=1.0, on_deadlock=None):
+        self.interval = interval
+        self.on_deadlock = on_deadlock or self.log_report
+        self._waiting = {}  # thread ident -> TrackedLock
+        self._suspects = set()
+        self._reported = set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def lock(self, name) -> TrackedLock:
+        return TrackedLock(name, self)
+
+    def find_cycles(self) -> list[list[tuple[int, TrackedLock]]]:
+        """Cycles of the wait-for graph, each a list of (thread ident, lock it waits for)."""
+        waiting = dict(self._waiting)
+        cycles, seen = [], set()
+        for start in waiting:
+            path, thread = [], start
+            while thread in waiting and thread not in seen:
+                seen.add(thread)
+                lock = waiting[thread]
+                path.append((thread, lock))
+                thread = lock.owner
+            threads = [t for t, _ in path]
+            if thread in threads:  # the chain came back to itself
+                cycles.append(path[threads.index(thread):])
+        return cycles
+
+    def check(self) -> list[list[tuple[int, TrackedLock]]]:
+        """One scan: reports and returns the cycles found twice in a row."""
+        found = {}
+        for cycle in self.find_cycles():
+            found[frozenset((t, lock.name) for t, lock in cycle)] = cycle
+        confirmed = [cycle for key, cycle in found.items() if key in self._suspects]
+        self._suspects = set(found)
+        for cycle in confirmed:
+            key = frozenset((t, lock.name) for t, lock in cycle)
+            if key not in self._reported:
+                self._reported.add(key)
+                self.on_deadlock(self.report(cycle))
+        return confirmed
+
+    @staticmethod
+    def report(cycle) -> str:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        lines = ["deadlock detected:"]
+        for thread, lock in cycle:
+            owner = lock.owner
+            lines.append(f"  {names.get(thread, thread)} waits for {lock.name}, "
+                         f"held by {names.get(owner, owner)}")
+        for thread, _ in cycle:
+            lines.append(f"stack of {names.get(thread, thread)}:")
+            if thread in frames:
+                lines.extend(line.rstrip() for line in traceback.format_stack(frames[thread]))
+        return "\n".join(lines)
+
+    @staticmethod
+    def log_report(report: str) -> None:
+        logger.error(report)
+
+    def start(self) -> "DeadlockDetector":
+        self._thread = threading.Thread(target=self._run, name="deadlock-detector", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def deadlock_example():
+    """
+    The crossing transfers of dead_lock.py with tracked locks: the detector
+    reports the deadlock, and the timeouts let the threads give up afterwards.
+    """
+    detector = DeadlockDetector(interval=0.1).start()
+    alice, bob = detector.lock("Alice"), detector.lock("Bob")
+
+    def transfer(source, target):
+        with source:
+            time.sleep(0.1)
+            if target.acquire(timeout=1):
+                target.release()
+            else:
+                logger.info(f"{threading.current_thread().name}: gave up on {target.name}")
+
+    threads = [
+        threading.Thread(target=transfer, args=(alice, bob), name="Thread A"),
+        threading.Thread(target=transfer, args=(bob, alice), name="Thread B"),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    detector.stop()
+
+
+def benchmark(threads_count=8, operations=100_000, locks_count=16):
+    """The cost of the instrumentation when there is no deadlock."""
+    detector = DeadlockDetector(interval=0.01).start()
+    for name, make in (("threading.Lock", lambda i: threading.Lock()),
+                       ("TrackedLock   ", lambda i: detector.lock(i))):
+        locks = [make(i) for i in range(locks_count)]
+
+        def work(seed):
+            for n in range(operations):
+                with locks[(seed + n) % locks_count]:
+                    pass
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(threads_count)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        logger.info(f"{name}: {threads_count * operations / elapsed:,.0f} acquire/release per second")
+    detector.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    deadlock_example()
+    # benchmark()
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+
+
+class KeyedLock:
+    """
+    Locks by key, created on demand and dropped when nobody uses them.
+
+    Giving every User object its own threading.Lock (and asyncio.Lock)
+    costs memory for millions of users, while only a few of them are ever
+    contended. Here a lock exists for a key only while some thread holds
+    it or waits for it: the table keeps a reference count per key, and the
+    entry is removed when the count drops back to zero. Memory follows the
+    contention, not the number of users.
+
+        user_locks = KeyedLock()
+        with user_locks.lock(user.username):
+            ...
+    """
+    def __init__(self):
+        self._table = {}  # key -> [lock, users]
+        self._table_lock = threading.Lock()
+
+    def __len__(self):
+        """Number of keys that are locked or waited for right now."""
+        return len(self._table)
+
+    def acquire(self, key, blocking=True, timeout=-1) -> bool:
+        with self._table_lock:
+            entry = self._table.get(key)
+            if entry is None:
+                entry = self._table[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        # wait outside the table lock, other keys must not be blocked
+        if entry[0].acquire(blocking, timeout):
+            return True
+        self._unref(key, entry)
+        return False
+
+    def release(self, key) -> None:
+        entry = self._table[key]
+        entry[0].release()
+        self._unref(key, entry)
+
+    def _unref(self, key, entry) -> None:
+        with self._table_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._table[key]
+
+    @contextmanager
+    def lock(self, key):
+        self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+
+class AsyncKeyedLock:
+    """
+    The coroutine version of KeyedLock. All coroutines run in one thread,
+    so the table itself needs no lock.
+
+        async with user_locks.lock(user.username):
+            ...
+    """
+    def __init__(self):
+        self._table = {}  # key -> [lock, users]
+
+    def __len__(self):
+        return len(self._table)
+
+    @asynccontextmanager
+    async def lock(self, key):
+        entry = self._table.get(key)
+        if entry is None:
+            entry = self._table[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            # also reached when the task is cancelled while waiting
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._table[key]
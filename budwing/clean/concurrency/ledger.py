@@ -0,0 +1,193 @@
+import array
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class Ledger:
+    """
+    Group commit ledger engine.
+
+    In race_condition.py every withdrawal, and in dead_lock.py every transfer,
+    takes its own locks and waits for its own slow step (the database write).
+    With many threads, most of the time is spent waiting for those locks.
+
+    Here the threads don't touch the balances at all. withdraw() and
+    transfer() put the operation on a queue and return a Future. One
+    committer thread takes everything that is queued (up to max_batch),
+    applies the whole batch in one pass inside one critical section, does
+    the slow step once for the whole batch, and then completes the futures.
+    Each operation succeeds or fails on its own: the future's result is
+    True, or False when the balance is insufficient. An invalid operation
+    (an account id out of range or not an int, an amount that isn't
+    positive) fails its future without reaching the committer, and
+    submitting after close() raises RuntimeError.
+
+    The balances live in an array indexed by account id, no object and no
+    lock per account.
+    """
+
+    _STOP = object()
+
+    def __init__(self, balances, max_batch=1000, io_time=0.1):
+        self._balances = array.array("d", balances)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.max_batch = max_batch
+        self.io_time = io_time
+        self.batches = 0
+        self._closed = False
+        self._closing_lock = threading.Lock()
+        self._committer = threading.Thread(target=self._run, name="ledger-committer", daemon=True)
+        self._committer.start()
+
+    def withdraw(self, account, amount) -> Future:
+        return self._submit(account, None, amount)
+
+    def transfer(self, source, target, amount) -> Future:
+        return self._submit(source, target, amount)
+
+    def _submit(self, source, target, amount) -> Future:
+        future = Future()
+        try:
+            self._check(source)
+            if target is not None:
+                self._check(target)
+            if not amount > 0:
+                raise ValueError(f"amount must be positive, got {amount}")
+        except (TypeError, IndexError, ValueError) as e:
+            future.set_exception(e)
+            return future
+        with self._closing_lock:  # nothing may be queued behind _STOP
+            if self._closed:
+                raise RuntimeError("cannot submit after close()")
+            self._queue.put((future, source, target, amount))
+        return future
+
+    def _check(self, account):
+        if not isinstance(account, int) or isinstance(account, bool):
+            raise TypeError(f"account ids are ints, not {type(account).__name__}")
+        if not 0 <= account < len(self._balances):  # a negative index would be valid for the array
+            raise IndexError(f"no account {account}")
+
+    def balance(self, account):
+        with self._lock:
+            return self._balances[account]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]  # wait for the first operation
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(operation is self._STOP for operation in batch)
+            if stop:
+                batch = [operation for operation in batch if operation is not self._STOP]
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        results = []
+        with self._lock:
+            for future, source, target, amount in batch:
+                try:
+                    if self._balances[source] < amount:
+                        results.append((future, False, None))
+                        continue
+                    if target is not None:
+                        self._balances[target] += amount  # raises first for a bad target
+                    self._balances[source] -= amount
+                    results.append((future, True, None))
+                except Exception as e:  # one bad operation must not stop the committer
+                    results.append((future, None, e))
+
+        # the slow step (e.g. writing the batch to the database) once per batch
+        time.sleep(self.io_time)
+        self.batches += 1
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self):
+        """Commits what is queued and stops the committer."""
+        with self._closing_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._committer.join()
+
+
+def per_operation_locking(balances, locks, source, target, amount, io_time):
+    """
+    The dead_lock.py way: lock the accounts in a fixed order, do the slow
+    step while holding the locks.
+    """
+    accounts = sorted({source, target} - {None})
+    for account in accounts:
+        locks[account].acquire()
+    try:
+        if balances[source] < amount:
+            return False
+        time.sleep(io_time)
+        if target is not None:
+            balances[target] += amount
+        balances[source] -= amount
+        return True
+    finally:
+        for account in reversed(accounts):
+            locks[account].release()
+
+
+def benchmark(threads_count=50, operations=20, accounts=10, io_time=0.005):
+    def operation(i, n):
+        source = (i + n) % accounts
+        target = None if n % 2 else (source + 1) % accounts
+        return source, target, 1.0
+
+    balances = [1000.0] * accounts
+    locks = [threading.Lock() for _ in range(accounts)]
+
+    def locked_client(i):
+        for n in range(operations):
+            per_operation_locking(balances, locks, *operation(i, n), io_time)
+
+    ledger = Ledger([1000.0] * accounts, io_time=io_time)
+
+    def ledger_client(i):
+        for n in range(operations):
+            source, target, amount = operation(i, n)
+            if target is None:
+                ledger.withdraw(source, amount).result()
+            else:
+                ledger.transfer(source, target, amount).result()
+
+    total = threads_count * operations
+    for name, client in (("per-operation locking", locked_client), ("group commit ledger  ", ledger_client)):
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(threads_count)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        logger.info(f"{name}: {total / elapsed:.0f} operations/s")
+    ledger.close()
+    logger.info(f"ledger committed {total} operations in {ledger.batches} batches")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    benchmark()
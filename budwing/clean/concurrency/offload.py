@@ -0,0 +1,134 @@
+import asyncio
+import functools
+import importlib
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from budwing.clean.concurrency.starvation import heartbeat
+
+# sizes of the shared pools, read when a pool is first used
+PROCESS_WORKERS = os.cpu_count() or 1
+THREAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def shared_pool(kind="process"):
+    """The pool shared by every offloaded function: "process" or "thread"."""
+    with _pools_lock:
+        if kind not in _pools:
+            if kind == "process":
+                _pools[kind] = ProcessPoolExecutor(max_workers=PROCESS_WORKERS)
+            elif kind == "thread":
+                _pools[kind] = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="offload")
+            else:
+                raise ValueError(f"unknown pool kind {kind!r}, expected 'process' or 'thread'")
+        return _pools[kind]
+
+
+def shutdown_pools(wait=True):
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _call_by_name(module, qualname, args, kwargs):
+    """
+    Runs in the worker process. A decorated function can't be pickled:
+    its name now points to the Offloaded wrapper. So the worker looks the
+    wrapper up by name and calls the function it wraps. Anything else
+    found by that name is called as it is, with its own decorators.
+    """
+    target = importlib.import_module(module)
+    for name in qualname.split("."):
+        target = getattr(target, name)
+    if isinstance(target, Offloaded):
+        target = target.__wrapped__
+    return target(*args, **kwargs)
+
+
+async def run_offloaded(func, *args, kind="process", **kwargs):
+    """
+    Runs func(*args, **kwargs) in the shared pool and awaits the result.
+
+    Cancelling the awaiting coroutine cancels the pool's future: a call
+    still queued never runs. A call already running can't be interrupted,
+    it finishes in its worker and the result is dropped.
+    """
+    if kind == "process":
+        future = shared_pool(kind).submit(_call_by_name, func.__module__, func.__qualname__, args, kwargs)
+    else:
+        future = shared_pool(kind).submit(func, *args, **kwargs)
+    return await asyncio.wrap_future(future)  # cancellation goes through to the pool's future
+
+
+class Offloaded:
+    """
+    A CPU-bound function turned into a coroutine function that runs it in a
+    shared pool, so the event loop is never blocked (see starvation.py).
+
+    - kind="process" for pure Python code, which holds the GIL
+    - kind="thread" for code that releases the GIL (hashlib, zlib, numpy...)
+    - max_in_flight limits how many calls of this function are in the pool
+      at once; the others wait in the event loop, where cancelling is free
+      (the limit is per event loop, an asyncio.Semaphore belongs to one loop)
+
+    The function must be defined at module level, the worker processes
+    find it by name.
+    """
+    def __init__(self, func, kind="process", max_in_flight=None):
+        functools.update_wrapper(self, func)
+        self.kind = kind
+        self.max_in_flight = max_in_flight
+        self._slots = weakref.WeakKeyDictionary()  # event loop -> semaphore
+
+    async def __call__(self, *args, **kwargs):
+        if self.max_in_flight is None:
+            return await run_offloaded(self.__wrapped__, *args, kind=self.kind, **kwargs)
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_in_flight)
+        async with slots:
+            return await run_offloaded(self.__wrapped__, *args, kind=self.kind, **kwargs)
+
+
+def offload(func=None, *, kind="process", max_in_flight=None):
+    """
+        @offload
+        def sum_of_squares(start, stop): ...
+
+        total = await sum_of_squares(0, 1_000_000)
+    """
+    if func is None:
+        return functools.partial(Offloaded, kind=kind, max_in_flight=max_in_flight)
+    return Offloaded(func, kind, max_in_flight)
+
+
+@offload(max_in_flight=PROCESS_WORKERS)
+def sum_of_squares(start, stop):
+    total = 0
+    for i in range(start, stop):
+        total += i * i
+    return total
+
+
+async def main(times=200_000_000, chunks=16):
+    """The computation of starvation.py, in the process pool, next to the heartbeat."""
+    beat = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    step = times // chunks
+    parts = await asyncio.gather(*(sum_of_squares(i, min(i + step, times)) for i in range(0, times, step)))
+    print(f"Finished: {sum(parts)} in {time.perf_counter() - start:.1f}s")
+    beat.cancel()
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
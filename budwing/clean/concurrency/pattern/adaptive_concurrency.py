@@ -0,0 +1,151 @@
+"""
+Adaptive concurrency control for the URL fetcher.
+
+thread_pool.py fixes max_workers=3: too few for a fast host, too many for
+a host that is struggling. AIMDLimiter adjusts the number of requests in
+flight from what it observes, the same way TCP adjusts its window:
+- Additive Increase: every good response adds 1/limit, so the limit
+  grows by about one per round trip while the host keeps up
+- Multiplicative Decrease: an error, or a latency far above the best
+  latency seen so far, multiplies the limit by `backoff`
+
+The best latency ("baseline") slowly drifts up, so the limiter doesn't
+stay pinned to a latency the host could only reach once.
+
+AdaptiveFetcher wraps fetch_status with one limiter for all hosts or one
+per host. The executor only has to be large enough for the highest limit,
+the limiter decides how many of its workers really send requests.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import urlsplit
+
+from budwing.clean.concurrency.pattern.pooled_fetcher import PooledFetcher
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+
+
+class AIMDLimiter:
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 200,
+        backoff: float = 0.9,
+        tolerance: float = 1.5,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """The current concurrency limit, export it as a metric."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, ok: bool) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if ok:
+                self._update_baseline(latency)
+
+            if not ok or latency > self._baseline * self.tolerance:
+                # one decrease per baseline round trip, or a burst of slow
+                # responses from the same window would collapse the limit
+                now = time.monotonic()
+                if now - self._last_decrease > (self._baseline or 0):
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def _update_baseline(self, latency: float) -> None:
+        if self._baseline is None or latency < self._baseline:
+            self._baseline = latency
+        else:
+            self._baseline += (latency - self._baseline) * 0.001
+
+
+class AdaptiveFetcher:
+    def __init__(self, fetch: Callable[[str], dict], per_host: bool = True, **limiter_options):
+        self._fetch = fetch
+        self._per_host = per_host
+        self._limiter_options = limiter_options
+        self._limiters: dict[str, AIMDLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, url: str) -> AIMDLimiter:
+        key = urlsplit(url).netloc if self._per_host else "*"
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = AIMDLimiter(**self._limiter_options)
+            return self._limiters[key]
+
+    @property
+    def limits(self) -> dict[str, int]:
+        """Current limit per host ("*" when global)."""
+        with self._lock:
+            return {key: limiter.limit for key, limiter in self._limiters.items()}
+
+    def fetch_status(self, url: str) -> dict:
+        limiter = self._limiter(url)
+        limiter.acquire()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self._fetch(url)
+            return result
+        finally:
+            ok = result is not None and result["error"] is None and result["status"] < 500
+            limiter.release(time.perf_counter() - start, ok)
+
+
+def _goodput(server: StubServer, fetch, concurrency: int, n: int, url: str) -> float:
+    """
+    Send n requests in two phases, the server capacity changes in between.
+    Returns the successful requests per second.
+    """
+    ok = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for capacity in (8, 32):
+            server.capacity = capacity
+            results = executor.map(fetch, [url] * (n // 2))
+            ok += sum(r["status"] == 200 for r in results)
+    return ok / (time.perf_counter() - start)
+
+
+def benchmark(n: int = 1000, delay: float = 0.05):
+    with StubServer() as server, PooledFetcher(max_workers=64) as pooled:
+        url = server.url(f"/delay/{delay}")
+        print(f"{n} requests, {delay}s delay, server capacity 8 then 32")
+        for workers in (4, 8, 16, 32, 64):
+            goodput = _goodput(server, pooled.fetch_status, workers, n, url)
+            print(f"  fixed {workers:>2} workers: {goodput:.0f} ok/s")
+
+        adaptive = AdaptiveFetcher(pooled.fetch_status, max_limit=64)
+        goodput = _goodput(server, adaptive.fetch_status, 64, n, url)
+        print(f"  adaptive       : {goodput:.0f} ok/s, final limits {adaptive.limits}")
+
+
+if __name__ == "__main__":
+    benchmark()
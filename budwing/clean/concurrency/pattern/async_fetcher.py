@@ -0,0 +1,131 @@
+"""
+asyncio version of thread_pool.fetch_status.
+
+Checking a URL is pure I/O waiting, so a thread per in-flight request
+wastes a stack and caps the concurrency at max_workers. Here every request
+is a coroutine, and the concurrency is bounded by two kinds of semaphores:
+- a global one, which limits the total number of open connections
+- one per host, so a long URL list for one host doesn't hammer it
+
+Only the standard library is used: the request is written by hand over
+asyncio.open_connection() and only the status line and the headers are
+read back. Redirects (3xx with a Location) are followed, up to
+max_redirects like requests does, so the status is the one of the final
+URL, as with fetch_status(). The timeout applies to each hop.
+The result has the same shape as fetch_status():
+{"url": ..., "status": ..., "error": ...}
+"""
+
+import asyncio
+import ssl
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+from budwing.clean.concurrency.pattern.thread_pool import fetch_status
+
+
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+class AsyncStatusChecker:
+    def __init__(self, max_concurrency: int = 200, per_host: int = 50, timeout: float = 5,
+                 max_redirects: int = 30):
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.per_host = per_host
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts: dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host)
+        )
+        self._ssl = ssl.create_default_context()
+
+    async def fetch_status(self, url: str) -> dict:
+        try:
+            current = url
+            for _ in range(self.max_redirects + 1):
+                parts = urlsplit(current)
+                if parts.scheme not in ("http", "https") or not parts.hostname:
+                    raise ValueError(f"unsupported url: {current}")
+                # take the host slot first, so a busy host doesn't hold global slots
+                async with self._hosts[parts.netloc], self._global:
+                    status, location = await asyncio.wait_for(self._request(parts), self.timeout)
+                if status not in _REDIRECTS or not location:
+                    return {"url": url, "status": status, "error": None}
+                current = urljoin(current, location)
+            raise ConnectionError(f"exceeded {self.max_redirects} redirects")
+        except Exception as e:
+            return {"url": url, "status": None, "error": str(e) or type(e).__name__}
+
+    async def _request(self, parts) -> tuple[int, str]:
+        """Returns the status and the Location header (or None)."""
+        https = parts.scheme == "https"
+        port = parts.port or (443 if https else 80)
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=self._ssl if https else None
+        )
+        try:
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            writer.write(
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                "User-Agent: budwing-async-fetcher\r\n"
+                "Connection: close\r\n\r\n".encode("ascii")
+            )
+            await writer.drain()
+            status_line = await reader.readline()  # e.g. b"HTTP/1.1 200 OK\r\n"
+            fields = status_line.split(maxsplit=2)
+            if len(fields) < 2 or not fields[0].startswith(b"HTTP/"):
+                raise ConnectionError(f"bad status line: {status_line!r}")
+            location = None
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"location":
+                    location = value.strip().decode("latin-1")
+            return int(fields[1]), location
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def check(self, urls: list[str]) -> list[dict]:
+        return await asyncio.gather(*(self.fetch_status(url) for url in urls))
+
+
+async def check_urls(urls: list[str], max_concurrency: int = 200, per_host: int = 50) -> list[dict]:
+    checker = AsyncStatusChecker(max_concurrency, per_host)
+    return await checker.check(urls)
+
+
+def benchmark(n: int = 10_000, delay: float = 0.01, max_workers: int = 3):
+    """
+    Thread pool (thread_pool.py settings) against the asyncio checker.
+    The stub server answers every request after `delay` seconds.
+    """
+    with StubServer() as server:
+        urls = [server.url(f"/delay/{delay}")] * n
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            threaded = list(executor.map(fetch_status, urls))
+        threaded_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async_results = asyncio.run(check_urls(urls))
+        async_time = time.perf_counter() - start
+
+    ok = sum(r["status"] == 200 for r in threaded)
+    print(f"{n} URLs, {delay}s server delay")
+    print(f"  ThreadPoolExecutor({max_workers}): {threaded_time:.2f}s, {ok} ok")
+    ok = sum(r["status"] == 200 for r in async_results)
+    print(f"  AsyncStatusChecker   : {async_time:.2f}s, {ok} ok")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,228 @@
+"""
+A multi-stage asyncio pipeline with end-of-stream signalling.
+
+producer_consumer_coroutine.consumer wraps every q.get() in
+asyncio.wait_for(..., timeout=2). Every item pays for the timeout
+machinery, and the consumers only notice the producer is done after
+idling for 2 seconds.
+
+AsyncPipeline is the coroutine twin of pipeline.Pipeline:
+- every stage has a function (plain, async, or any callable returning an
+  awaitable, like an @offload function), a number of worker tasks and a
+  bounded asyncio.Queue in front of it
+- a stage gets one END_OF_STREAM per worker, the last worker of a stage
+  to stop sends them on to the next stage, so q.get() needs no timeout
+- the first exception cancels every worker (a cancelled put() can't block
+  forever) and is re-raised by run()
+
+run(..., eager=True) starts the pipeline's own tasks eagerly (Python
+3.12+, Task(eager_start=True)): a new task starts running immediately
+instead of waiting for the next loop iteration, which saves a scheduling
+round trip when the coroutine finishes without suspending. The loop's
+task factory is left alone, other tasks on the loop are not affected.
+"""
+
+import asyncio
+import inspect
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, Callable, Iterable, Union
+
+from budwing.clean.concurrency.pattern.batching import END_OF_STREAM
+
+logger = logging.getLogger(__name__)
+
+_EAGER_START = sys.version_info >= (3, 12)
+
+
+class AsyncStage:
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, maxsize: int = 10):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.maxsize = maxsize
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts a new run: all workers running, counter at zero."""
+        self.processed = 0
+        self.running = self.workers
+
+
+class AsyncPipeline:
+    def __init__(self):
+        self.stages: list[AsyncStage] = []
+
+    def add_stage(self, name: str, func: Callable[[Any], Any], workers: int = 1, maxsize: int = 10) -> "AsyncPipeline":
+        self.stages.append(AsyncStage(name, func, workers, maxsize))
+        return self
+
+    @staticmethod
+    async def _feed(items: Union[Iterable, AsyncIterable], q: asyncio.Queue, workers: int) -> None:
+        if hasattr(items, "__aiter__"):
+            async for item in items:
+                await q.put(item)
+        else:
+            for item in items:
+                await q.put(item)
+        for _ in range(workers):
+            await q.put(END_OF_STREAM)
+
+    @staticmethod
+    async def _work(stage: AsyncStage, inbox: asyncio.Queue, outbox: asyncio.Queue, next_workers: int) -> None:
+        while (item := await inbox.get()) is not END_OF_STREAM:
+            result = stage.func(item)
+            if inspect.isawaitable(result):  # also callables with an async __call__
+                result = await result
+            stage.processed += 1
+            await outbox.put(result)
+
+        stage.running -= 1  # single thread, no lock needed
+        if stage.running == 0:
+            for _ in range(next_workers):
+                await outbox.put(END_OF_STREAM)
+
+    async def run(self, items: Union[Iterable, AsyncIterable], eager: bool = False) -> list:
+        """
+        Push every item through the stages and return the results of the
+        last stage (in completion order).
+        """
+        if not self.stages:
+            raise ValueError("Pipeline has no stage")
+        if eager and not _EAGER_START:
+            logger.warning("eager task start needs Python 3.12+, starting tasks normally")
+        for stage in self.stages:
+            stage.reset()
+        queues = [asyncio.Queue(maxsize=stage.maxsize) for stage in self.stages]
+        results = asyncio.Queue()
+        tasks = [_start_task(eager, self._feed(items, queues[0], self.stages[0].workers))]
+        for i, stage in enumerate(self.stages):
+            last = i == len(self.stages) - 1
+            outbox = results if last else queues[i + 1]
+            next_workers = 1 if last else self.stages[i + 1].workers
+            tasks += [
+                _start_task(eager, self._work(stage, queues[i], outbox, next_workers))
+                for _ in range(stage.workers)
+            ]
+
+        async def collect():
+            collected = []
+            while (item := await results.get()) is not END_OF_STREAM:
+                collected.append(item)
+            return collected
+
+        tasks.append(_start_task(eager, collect()))
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return tasks[-1].result()
+
+
+def _start_task(eager: bool, coro) -> asyncio.Task:
+    if eager and _EAGER_START:
+        return asyncio.Task(coro, loop=asyncio.get_running_loop(), eager_start=True)
+    return asyncio.create_task(coro)
+
+
+@contextmanager
+def _eager_tasks(enabled: bool = True):
+    """
+    Installs eager_task_factory on the running loop, and restores the previous
+    factory. Only for the benchmark, which owns its loop.
+    """
+    loop = asyncio.get_running_loop()
+    previous = loop.get_task_factory()
+    factory = getattr(asyncio, "eager_task_factory", None)
+    if enabled:
+        if factory is None:
+            logger.warning("eager_task_factory needs Python 3.12+, using the default factory")
+        else:
+            loop.set_task_factory(factory)
+    try:
+        yield
+    finally:
+        loop.set_task_factory(previous)
+
+
+async def _wait_for_loop(n: int, consumers: int, eager: bool) -> tuple[float, float]:
+    """
+    The producer_consumer_coroutine.py consumer. Returns the time to consume
+    every item and the time until the consumers noticed the end.
+    """
+    with _eager_tasks(eager):
+        return await _consume_with_wait_for(n, consumers)
+
+
+async def _consume_with_wait_for(n: int, consumers: int) -> tuple[float, float]:
+    q = asyncio.Queue(maxsize=100)
+
+    async def consumer():
+        while True:
+            try:
+                await asyncio.wait_for(q.get(), timeout=2)
+                q.task_done()
+            except asyncio.TimeoutError:
+                break
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(consumer()) for _ in range(consumers)]
+    for i in range(n):
+        await q.put(i)
+    await q.join()
+    consumed = time.perf_counter() - start
+    await asyncio.gather(*tasks)
+    return consumed, time.perf_counter() - start
+
+
+async def _pipeline(n: int, consumers: int, eager: bool) -> float:
+    async def consume(item):
+        return item
+
+    pipeline = AsyncPipeline().add_stage("consume", consume, workers=consumers, maxsize=100)
+    start = time.perf_counter()
+    await pipeline.run(range(n), eager=eager)
+    return time.perf_counter() - start
+
+
+def benchmark(n: int = 200_000, consumers: int = 2):
+    print(f"{n} items, {consumers} consumers")
+    for eager in (False, True):
+        consumed, total = asyncio.run(_wait_for_loop(n, consumers, eager))
+        print(f"  wait_for loop  (eager={eager!s:<5}): {n / consumed:>8.0f} items/s, "
+              f"finished after {total:.2f}s")
+        total = asyncio.run(_pipeline(n, consumers, eager))
+        print(f"  AsyncPipeline  (eager={eager!s:<5}): {n / total:>8.0f} items/s, "
+              f"finished after {total:.2f}s")
+
+
+async def main():
+    async def fetch(i):
+        await asyncio.sleep(0.01)  # IO bound
+        return f"item-{i}"
+
+    def parse(item):
+        return item.upper()
+
+    pipeline = (
+        AsyncPipeline()
+        .add_stage("fetch", fetch, workers=20, maxsize=20)
+        .add_stage("parse", parse, workers=1, maxsize=20)
+    )
+    start = time.time()
+    results = await pipeline.run(range(500))
+    logger.info("%d results in %.2f seconds", len(results), time.time() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    asyncio.run(main())
+    benchmark()
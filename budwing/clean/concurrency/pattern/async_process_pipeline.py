@@ -0,0 +1,136 @@
+"""
+Async producers feeding a process pool, with end-to-end backpressure.
+
+The real workload reads from sockets (I/O, a job for asyncio) and then
+computes heavily (CPU, a job for processes). Computing in a coroutine
+blocks the event loop (see starvation.py), and handing every item to
+run_in_executor() without a limit lets the executor's internal queue grow
+without bound when the processes fall behind.
+
+ProcessOffloader puts a semaphore of `max_in_flight` slots in front of the
+process pool. submit() waits for a free slot before handing the item over,
+so a producer that submits faster than the processes compute is suspended
+in submit(), stops reading its socket, and the backpressure reaches the
+sender through TCP flow control. Meanwhile the event loop is never blocked,
+which heartbeat() measures as the lag of a periodic timer.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable
+
+from budwing.clean.concurrency.pattern.batching import END_OF_STREAM
+
+
+class ProcessOffloader:
+    def __init__(self, func: Callable[[Any], Any], executor: Executor, max_in_flight: int = 8):
+        self._func = func
+        self._executor = executor
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.max_seen = 0
+        self.submitted = 0
+
+    def _release(self, _future) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def submit(self, item: Any) -> asyncio.Future:
+        """Waits for a free slot, then returns the future of func(item)."""
+        await self._slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._func, item)
+        except BaseException:
+            self._slots.release()  # e.g. the pool is broken or shut down
+            raise
+        self.in_flight += 1
+        self.submitted += 1
+        self.max_seen = max(self.max_seen, self.in_flight)
+        future.add_done_callback(self._release)
+        return future
+
+
+async def heartbeat(interval: float, lags: list, stop: asyncio.Event) -> None:
+    """Records how late every tick of a periodic timer fires."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - expected)
+
+
+def cpu_bound_task(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+async def socket_producer(offloader: ProcessOffloader, results: asyncio.Queue, n: int) -> None:
+    for i in range(n):
+        await asyncio.sleep(0.001)  # stands in for reading a request from a socket
+        future = await offloader.submit(200_000 + i)
+        await results.put(future)
+
+
+async def consumer(results: asyncio.Queue, producers: int) -> int:
+    done = 0
+    while producers:
+        future = await results.get()
+        if future is END_OF_STREAM:
+            producers -= 1
+            continue
+        await future
+        done += 1
+    return done
+
+
+async def run_hybrid(producers: int = 4, n: int = 50, max_in_flight: int = 4, workers: int = 2) -> None:
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(0.01, lags, stop))
+    results = asyncio.Queue(maxsize=max_in_flight)
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        offloader = ProcessOffloader(cpu_bound_task, executor, max_in_flight)
+
+        async def produce():
+            await socket_producer(offloader, results, n)
+            await results.put(END_OF_STREAM)
+
+        tasks = [asyncio.create_task(produce()) for _ in range(producers)]
+        done = await consumer(results, producers)
+        await asyncio.gather(*tasks)
+
+    stop.set()
+    await beat
+    elapsed = time.perf_counter() - start
+    print(f"  process pool : {done / elapsed:.0f} items/s, max in flight {offloader.max_seen}, "
+          f"heartbeat lag max {max(lags) * 1000:.1f}ms, avg {sum(lags) / len(lags) * 1000:.1f}ms")
+
+
+async def run_in_loop(producers: int = 4, n: int = 50) -> None:
+    """The same work computed inside the coroutines, for comparison."""
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(0.01, lags, stop))
+    start = time.perf_counter()
+
+    async def produce():
+        for i in range(n):
+            await asyncio.sleep(0.001)
+            cpu_bound_task(200_000 + i)
+
+    await asyncio.gather(*(produce() for _ in range(producers)))
+    stop.set()
+    await beat
+    elapsed = time.perf_counter() - start
+    print(f"  event loop   : {producers * n / elapsed:.0f} items/s, "
+          f"heartbeat lag max {max(lags) * 1000:.1f}ms, avg {sum(lags) / len(lags) * 1000:.1f}ms")
+
+
+def main():
+    print("4 producers x 50 items, heartbeat every 10ms")
+    asyncio.run(run_in_loop())
+    asyncio.run(run_hybrid())
+
+
+if __name__ == "__main__":
+    main()
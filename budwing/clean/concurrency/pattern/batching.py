@@ -0,0 +1,167 @@
+"""
+Micro-batching consumers.
+
+The consumers in producer_consumer.py and producer_consumer_coroutine.py
+take one item at a time. When the per-call cost of the sink dominates
+(a DB insert, an HTTP call, a disk flush), handling items one by one
+wastes most of the time on that fixed cost.
+
+A batching consumer collects items until either
+- `max_batch` items are collected, or
+- `max_latency` seconds passed since the first item of the batch arrived,
+whichever happens first, and hands the list to a batch handler. Bigger
+batches mean more throughput but items wait longer, so max_latency puts a
+bound on the extra latency.
+
+Both variants stop when they get END_OF_STREAM, after flushing the last
+(partial) batch. The async variant accepts a plain or an async handler.
+"""
+
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+END_OF_STREAM = object()
+
+
+def batching_consumer(
+    q: queue.Queue,
+    handler: Callable[[list], Any],
+    max_batch: int = 100,
+    max_latency: float = 0.01,
+) -> None:
+    done = False
+    while not done:
+        item = q.get()  # block for the first item of the batch
+        if item is END_OF_STREAM:
+            q.task_done()
+            return
+
+        batch = [item]
+        deadline = time.monotonic() + max_latency
+        while len(batch) < max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+            except queue.Empty:
+                break
+            if item is END_OF_STREAM:
+                done = True
+                break
+            batch.append(item)
+
+        try:
+            handler(batch)
+        finally:
+            for _ in range(len(batch) + done):
+                q.task_done()
+
+
+async def batching_consumer_async(
+    q: asyncio.Queue,
+    handler: Callable[[list], Any],
+    max_batch: int = 100,
+    max_latency: float = 0.01,
+) -> None:
+    loop = asyncio.get_running_loop()
+    done = False
+    while not done:
+        item = await q.get()
+        if item is END_OF_STREAM:
+            q.task_done()
+            return
+
+        batch = [item]
+        deadline = loop.time() + max_latency
+        while len(batch) < max_batch:
+            try:
+                # items already queued are taken without any timer
+                item = q.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(q.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is END_OF_STREAM:
+                done = True
+                break
+            batch.append(item)
+
+        try:
+            result = handler(batch)
+            if inspect.isawaitable(result):
+                await result
+        finally:
+            for _ in range(len(batch) + done):
+                q.task_done()
+
+
+def _bulk_sink(latencies: list):
+    """A sink with a fixed cost per call, like a DB round trip."""
+    def handle(batch):
+        time.sleep(0.001 + 0.00001 * len(batch))
+        now = time.perf_counter()
+        latencies.extend(now - enqueued for enqueued in batch)
+    return handle
+
+
+def _bulk_sink_async(latencies: list):
+    async def handle(batch):
+        await asyncio.sleep(0.001 + 0.00001 * len(batch))
+        now = time.perf_counter()
+        latencies.extend(now - enqueued for enqueued in batch)
+    return handle
+
+
+def _report(name: str, n: int, elapsed: float, latencies: list) -> None:
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"  {name}: {n / elapsed:>8.0f} items/s, latency p50 {p50:.1f}ms, p99 {p99:.1f}ms")
+
+
+def benchmark_threads(n: int, max_batch: int, max_latency: float) -> None:
+    q = queue.Queue(maxsize=1000)
+    latencies = []
+    consumer = threading.Thread(
+        target=batching_consumer, args=(q, _bulk_sink(latencies), max_batch, max_latency)
+    )
+    start = time.perf_counter()
+    consumer.start()
+    for _ in range(n):
+        q.put(time.perf_counter())
+    q.put(END_OF_STREAM)
+    consumer.join()
+    _report(f"thread batch={max_batch:<4}", n, time.perf_counter() - start, latencies)
+
+
+async def benchmark_async(n: int, max_batch: int, max_latency: float) -> None:
+    q = asyncio.Queue(maxsize=1000)
+    latencies = []
+    start = time.perf_counter()
+    consumer = asyncio.create_task(
+        batching_consumer_async(q, _bulk_sink_async(latencies), max_batch, max_latency)
+    )
+    for _ in range(n):
+        await q.put(time.perf_counter())
+    await q.put(END_OF_STREAM)
+    await consumer
+    _report(f"async  batch={max_batch:<4}", n, time.perf_counter() - start, latencies)
+
+
+def main(n: int = 5000, max_latency: float = 0.01):
+    print(f"{n} items, sink cost 1ms per call + 10us per item, max_latency {max_latency * 1000:.0f}ms")
+    for max_batch in (1, 10, 100, 1000):
+        benchmark_threads(n, max_batch, max_latency)
+    for max_batch in (1, 10, 100, 1000):
+        asyncio.run(benchmark_async(n, max_batch, max_latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Fail fast on unreachable hosts with a circuit breaker and a negative cache.
+
+fetch_status waits for the DNS lookup or the connect timeout of a dead host
+for every single URL, and each of those waits holds a worker.
+
+BreakerFetcher keeps two things per host:
+- a negative cache: a host whose name didn't resolve is remembered for
+  `dns_ttl` seconds, later URLs fail immediately without a lookup
+- a circuit breaker: after `failure_threshold` consecutive connection
+  failures the circuit opens and later URLs fail immediately. After
+  `reset_timeout` seconds one probe request is let through (half-open);
+  if it succeeds the circuit closes, otherwise it opens again.
+
+Only connection level failures count, an HTTP 404 or 500 means the host
+is reachable. A fetch function that raises counts as a failure too.
+
+@see <a href="https://martinfowler.com/bliki/CircuitBreaker.html">CircuitBreaker - Martin Fowler</a>
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import urlsplit
+
+from budwing.clean.concurrency.pattern.thread_pool import fetch_status
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the host's circuit is open."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError if the call must not be made."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True  # this caller is the probe
+                return
+            raise CircuitOpenError(
+                f"circuit {self.state} after {self._failures} failures, "
+                f"retry in {max(remaining, 0):.1f}s"
+            )
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class NegativeCache:
+    """Remembers failures for `ttl` seconds."""
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str:
+        """Returns the cached error, None if there is no live entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, error = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            return error
+
+    def put(self, key: str, error: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, error)
+
+
+def resolve_host(host: str) -> list:
+    """IPv4 and IPv6 lookup; gethostbyname would miss an IPv6-only host."""
+    return socket.getaddrinfo(host, None)
+
+
+class BreakerFetcher:
+    def __init__(
+        self,
+        fetch: Callable[[str], dict] = fetch_status,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30,
+        dns_ttl: float = 60,
+        resolve: Callable[[str], object] = resolve_host,
+    ):
+        self._fetch = fetch
+        self._resolve = resolve
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._dns_failures = NegativeCache(dns_ttl)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self._failure_threshold, self._reset_timeout)
+            return self._breakers[host]
+
+    def fetch_status(self, url: str) -> dict:
+        host = urlsplit(url).hostname or ""
+        dns_error = self._dns_failures.get(host)
+        if dns_error is not None:
+            return {"url": url, "status": None, "error": f"{host} did not resolve (cached): {dns_error}"}
+
+        breaker = self.breaker(host)
+        try:
+            breaker.before_call()
+        except CircuitOpenError as e:
+            return {"url": url, "status": None, "error": f"{host}: {e}"}
+
+        try:
+            result = self._fetch(url)
+        except Exception as e:
+            # still a failure: a half-open breaker must not keep waiting for its probe
+            result = {"url": url, "status": None, "error": str(e) or type(e).__name__}
+        if result["error"] is None:
+            breaker.on_success()
+            return result
+
+        breaker.on_failure()
+        # only look the name up again when the request failed, so healthy
+        # hosts don't pay for a second lookup
+        try:
+            self._resolve(host)
+        except OSError as e:
+            self._dns_failures.put(host, str(e))
+        return result
+
+
+def main():
+    urls = ["https://invalid.url.that.does.not.exist/page/%d" % i for i in range(20)]
+    urls += ["https://example.com"]
+
+    for name, fetch in (("fetch_status  ", fetch_status), ("BreakerFetcher", BreakerFetcher().fetch_status)):
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(fetch, urls))
+        failed = sum(r["error"] is not None for r in results)
+        print(f"{name}: {failed} failed, total time: {time.time() - start:.2f} seconds")
+        print(f"  last dead-host error: {results[-2]['error']}")
+
+
+if __name__ == "__main__":
+    main()
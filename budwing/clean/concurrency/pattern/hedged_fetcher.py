@@ -0,0 +1,128 @@
+"""
+Hedged requests for fetch_status.
+
+In thread_pool.py one slow response (httpbin.org/delay/2) decides when the
+whole batch is done. Most slow responses are bad luck: a GC pause, a busy
+backend, a lost packet. Asking again usually gets a fast answer.
+
+HedgedFetcher sends the request, and if no answer came back within the
+given percentile of the recent latencies, it sends a duplicate. The first
+response wins. The loser is cancelled if it hasn't started yet, otherwise
+its result is just ignored (a running requests call can't be aborted).
+
+Hedges add load, so they are capped by a budget: at most `budget` hedges
+per request sent, e.g. 0.05 means at most 5% extra requests.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+from budwing.clean.concurrency.pattern.pooled_fetcher import PooledFetcher
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+
+
+class HedgedFetcher:
+    def __init__(
+        self,
+        fetch: Callable[[str], dict],
+        max_workers: int = 16,
+        percentile: float = 95,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        window: int = 500,
+    ):
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _hedge_delay(self) -> float:
+        """Returns the percentile of recent latencies, None until enough samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.requests * self.budget:
+                return False
+            self.hedges += 1
+            return True
+
+    def fetch_status(self, url: str) -> dict:
+        start = time.perf_counter()
+        with self._lock:
+            self.requests += 1
+        primary = self._executor.submit(self._fetch, url)
+        futures = {primary}
+
+        delay = self._hedge_delay()
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._take_hedge():
+                futures.add(self._executor.submit(self._fetch, url))
+
+        done, pending = wait(futures, return_when=FIRST_COMPLETED)
+        for loser in pending:
+            loser.cancel()
+        winner = primary if primary in done else done.pop()
+
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+            if winner is not primary:
+                self.hedge_wins += 1
+        return winner.result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "HedgedFetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+def _latencies(fetch, urls: list[str], max_workers: int) -> list[float]:
+    def timed(url):
+        start = time.perf_counter()
+        fetch(url)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return sorted(executor.map(timed, urls))
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    print(f"  {name}: p50 {pct(50):.0f}ms, p95 {pct(95):.0f}ms, p99 {pct(99):.0f}ms")
+
+
+def benchmark(n: int = 1000, max_workers: int = 8):
+    with StubServer() as server, PooledFetcher(max_workers=32) as pooled:
+        # 2% of the responses take one second instead of 10ms
+        urls = [server.url("/delay/0.01?tail=0.02&tail_delay=1")] * n
+        print(f"{n} requests, 2% of them with 1s injected tail latency")
+        _report("plain ", _latencies(pooled.fetch_status, urls, max_workers))
+
+        with HedgedFetcher(pooled.fetch_status, percentile=95, budget=0.05) as hedged:
+            _report("hedged", _latencies(hedged.fetch_status, urls, max_workers))
+        print(f"  hedges sent: {hedged.hedges}, won: {hedged.hedge_wins}")
+
+
+if __name__ == "__main__":
+    benchmark()
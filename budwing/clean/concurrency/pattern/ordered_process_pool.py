@@ -0,0 +1,153 @@
+"""
+Fan items out to N consumer processes and reassemble the results in order.
+
+producer_consumer_processor.py starts exactly one consumer process, so the
+processing never uses more than one core. process_ordered() starts
+`workers` consumer processes instead:
+
+- items are sent in chunks of `chunksize`, one queue operation (one pickle,
+  one pipe write) carries many items
+- results come back per chunk, tagged with the chunk's sequence number;
+  with ordered=True they go through a reorder buffer and are yielded in
+  input order, otherwise as soon as they arrive
+- at most `window` chunks are out at a time. A slow chunk holds back the
+  ones after it, but no new chunk is sent until it arrives, so the
+  reorder buffer never holds more than `window` chunks
+
+An exception raised by `func` in a consumer is re-raised by the generator,
+and so is a result that can't be pickled. A consumer process that dies
+makes the generator raise RuntimeError instead of waiting forever.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import time
+from multiprocessing import Process, Queue
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+def _consumer(func: Callable[[Any], Any], tasks: Queue, results: Queue) -> None:
+    while (task := tasks.get()) is not None:
+        seq, chunk = task
+        try:
+            # pickle here: Queue.put pickles in a feeder thread, where a
+            # failure is only printed and the chunk would never come back
+            payload = pickle.dumps([func(item) for item in chunk], protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            results.put((seq, None, e))
+        else:
+            results.put((seq, payload, None))
+
+
+def _next_result(results: Queue, processes: list) -> tuple:
+    """Waits for a result, checking that the consumer processes are still alive."""
+    while True:
+        try:
+            return results.get(timeout=0.5)
+        except queue.Empty:
+            for p in processes:
+                if not p.is_alive():
+                    raise RuntimeError(f"consumer process {p.pid} died with exit code {p.exitcode}")
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def process_ordered(
+    items: Iterable,
+    func: Callable[[Any], Any],
+    workers: int = None,
+    chunksize: int = 64,
+    ordered: bool = True,
+    window: int = None,
+) -> Iterator:
+    """
+    Yields func(item) for every item, computed by `workers` processes.
+    func must be picklable, i.e. defined at module level.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    tasks, results = Queue(), Queue()
+    processes = [Process(target=_consumer, args=(func, tasks, results), daemon=True) for _ in range(workers)]
+    for p in processes:
+        p.start()
+
+    chunks = enumerate(_chunks(items, chunksize))
+    sent = received = next_seq = 0
+    reorder = {}  # seq -> results, waiting for an earlier chunk
+    try:
+        while True:
+            # keep the window full; sent - next_seq counts the chunks that
+            # are being processed or are waiting in the reorder buffer
+            while sent - next_seq < window:
+                task = next(chunks, None)
+                if task is None:
+                    break
+                tasks.put(task)
+                sent += 1
+            if received == sent:
+                return
+
+            seq, payload, error = _next_result(results, processes)
+            received += 1
+            if error is not None:
+                raise error
+            chunk_results = pickle.loads(payload)
+            if not ordered:
+                next_seq += 1
+                yield from chunk_results
+                continue
+            reorder[seq] = chunk_results
+            while next_seq in reorder:
+                yield from reorder.pop(next_seq)
+                next_seq += 1
+    finally:
+        for _ in processes:
+            tasks.put(None)
+        for p in processes:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+
+
+def cpu_bound_task(n: int) -> int:
+    # uneven cost, so chunks finish out of order
+    return sum(i * i for i in range(n % 7 * 5000))
+
+
+def main():
+    items = range(2000)
+    expected = [cpu_bound_task(n) for n in items]
+
+    for workers in sorted({1, 4, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        results = list(process_ordered(items, cpu_bound_task, workers=workers))
+        elapsed = time.perf_counter() - start
+        assert results == expected
+        logger.info("%d consumer processes: %.2f seconds, order preserved", workers, elapsed)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s: %(message)s"
+    )
+    logger.info("cpu count: %d, start method: %s", os.cpu_count(), multiprocessing.get_start_method())
+    main()
@@ -0,0 +1,194 @@
+"""
+A reusable multi-stage Pipeline built from the producer-consumer pattern.
+
+producer_consumer.py wires one producer to its consumers through one
+module-level queue, and the consumers only find out that the producer is
+done by waiting 2 seconds on an empty queue.
+
+Here every stage has a function, a number of worker threads and a bounded
+queue in front of it:
+
+    source -> [queue] -> stage 1 workers -> [queue] -> stage 2 workers -> results
+
+- shutdown flows through the stages with poison pills: a stage gets one
+  pill per worker, and the last of its workers to stop sends the pills
+  for the next stage, so nobody waits for a timeout
+- the first exception raised by a stage function stops the feeding, the
+  workers drain what is left so no put() blocks forever, and run()
+  re-raises it
+- every stage counts processed items, busy time and queue depth
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_POISON_PILL = object()
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1, maxsize: int = 10):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts a new run: all workers running, counters at zero."""
+        self.processed = 0
+        self.busy_time = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._running = self.workers
+
+    def record(self, depth: int, busy: float) -> None:
+        with self._lock:
+            self.processed += 1
+            self.busy_time += busy
+            self._depth_total += depth
+            self.max_depth = max(self.max_depth, depth)
+
+    def worker_stopped(self) -> bool:
+        """Returns True for the last worker of the stage."""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0
+
+    def stats(self, elapsed: float) -> dict:
+        with self._lock:
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "processed": self.processed,
+                "items_per_sec": self.processed / elapsed if elapsed else 0.0,
+                "utilization": self.busy_time / (elapsed * self.workers) if elapsed else 0.0,
+                "avg_queue_depth": self._depth_total / self.processed if self.processed else 0.0,
+                "max_queue_depth": self.max_depth,
+            }
+
+
+class Pipeline:
+    def __init__(self):
+        self.stages: list[Stage] = []
+        self._error: BaseException = None
+        self._failed = threading.Event()
+        self._elapsed = 0.0
+
+    def add_stage(self, name: str, func: Callable[[Any], Any], workers: int = 1, maxsize: int = 10) -> "Pipeline":
+        self.stages.append(Stage(name, func, workers, maxsize))
+        return self
+
+    def _fail(self, error: BaseException) -> None:
+        if not self._failed.is_set():
+            self._error = error
+            self._failed.set()
+
+    def _feed(self, items: Iterable) -> None:
+        first = self.stages[0]
+        try:
+            for item in items:
+                if self._failed.is_set():
+                    break
+                first.queue.put(item)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(first.workers):
+                first.queue.put(_POISON_PILL)
+
+    def _work(self, stage: Stage, output: queue.Queue, next_workers: int) -> None:
+        while True:
+            item = stage.queue.get()
+            if item is _POISON_PILL:
+                break
+            if self._failed.is_set():
+                continue  # drain, so that upstream never blocks on put()
+            depth = stage.queue.qsize()
+            start = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                logger.error("Stage %s failed on %r: %s", stage.name, item, e)
+                self._fail(e)
+                continue
+            stage.record(depth, time.perf_counter() - start)
+            output.put(result)
+
+        if stage.worker_stopped():
+            for _ in range(next_workers):
+                output.put(_POISON_PILL)
+
+    def run(self, items: Iterable) -> list:
+        """
+        Push every item through the stages and return the results of the
+        last stage (in completion order, not input order).
+        """
+        if not self.stages:
+            raise ValueError("Pipeline has no stage")
+        self._error = None
+        self._failed.clear()
+        for stage in self.stages:
+            stage.reset()
+        results = queue.Queue()
+        threads = [threading.Thread(target=self._feed, args=(items,), name="feeder")]
+        for i, stage in enumerate(self.stages):
+            last = i == len(self.stages) - 1
+            output = results if last else self.stages[i + 1].queue
+            next_workers = 1 if last else self.stages[i + 1].workers
+            threads += [
+                threading.Thread(target=self._work, args=(stage, output, next_workers), name=f"{stage.name}-{n}")
+                for n in range(stage.workers)
+            ]
+
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        collected = []
+        while (item := results.get()) is not _POISON_PILL:
+            collected.append(item)
+        for t in threads:
+            t.join()
+        self._elapsed = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+        return collected
+
+    def stats(self) -> list[dict]:
+        return [stage.stats(self._elapsed) for stage in self.stages]
+
+
+def main():
+    def download(i):
+        time.sleep(random.uniform(0.01, 0.03))  # IO bound
+        return f"page-{i}"
+
+    def parse(page):
+        time.sleep(0.005)
+        return page.upper()
+
+    pipeline = (
+        Pipeline()
+        .add_stage("download", download, workers=8, maxsize=16)
+        .add_stage("parse", parse, workers=2, maxsize=16)
+    )
+    start = time.time()
+    results = pipeline.run(range(200))
+    logger.info("%d results in %.2f seconds", len(results), time.time() - start)
+    for stats in pipeline.stats():
+        logger.info("%s", stats)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    main()
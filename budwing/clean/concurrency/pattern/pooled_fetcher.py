@@ -0,0 +1,86 @@
+"""
+Connection-pooled version of thread_pool.fetch_status.
+
+The module-level requests.get() builds a throwaway Session for every call,
+so every URL pays for a new TCP connection (and a TLS handshake for https),
+even when the previous URL was on the same host.
+
+PooledFetcher keeps one Session whose HTTPAdapter holds a connection pool
+per host. The pool is sized to the executor's max_workers, so every worker
+thread can hold a kept-alive connection to the same host at once, and
+pool_block=True makes extra threads wait for a free connection instead of
+opening (and then discarding) surplus ones.
+The urllib3 pools behind the adapter are thread-safe, so one fetcher can be
+shared by all the workers of a ThreadPoolExecutor.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+from budwing.clean.concurrency.pattern.thread_pool import fetch_status
+
+
+class PooledFetcher:
+    def __init__(self, max_workers: int, max_hosts: int = 10, timeout: int = 5):
+        """
+        max_workers: connections kept per host, match it with the executor.
+        max_hosts: number of per-host pools cached before the oldest is dropped.
+        """
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=max_workers,
+            pool_block=True,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    @property
+    def session(self) -> requests.Session:
+        return self._session
+
+    def fetch_status(self, url: str) -> dict:
+        return fetch_status(url, self.timeout, session=self._session)
+
+    def close(self) -> None:
+        self._session.close()
+
+    def __enter__(self) -> "PooledFetcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _run(fetch, urls: list[str], max_workers: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    assert all(r["status"] == 200 for r in results), "stub server returned errors"
+    return elapsed
+
+
+def benchmark(n: int = 2000, max_workers: int = 8, delay: float = 0.0):
+    """
+    Compare requests.get() against the pooled fetcher on a local stub server.
+    """
+    with StubServer() as server:
+        urls = [server.url(f"/delay/{delay}")] * n
+
+        unpooled = _run(fetch_status, urls, max_workers)
+        with PooledFetcher(max_workers=max_workers) as fetcher:
+            pooled = _run(fetcher.fetch_status, urls, max_workers)
+
+    print(f"{n} requests, {max_workers} workers, {delay}s server delay")
+    print(f"  requests.get : {unpooled:.2f}s ({n / unpooled:.0f} req/s)")
+    print(f"  PooledFetcher: {pooled:.2f}s ({n / pooled:.0f} req/s)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,171 @@
+"""
+Conditional requests for repeated status checks.
+
+fetch_status does a full GET and downloads the whole body, only to read
+the status code. When the same URLs are checked every few minutes, most of
+those bodies haven't changed.
+
+CachingFetcher keeps a small on-disk cache (sqlite3, standard library) of
+response metadata per URL: status, ETag, Last-Modified and body size.
+- it sends HEAD, so no body is downloaded at all; a server that refuses
+  HEAD (405/501) gets a streamed GET whose body is never read
+- when the URL is cached, If-None-Match / If-Modified-Since are sent, a
+  304 answer means the cached status is still valid
+- the cache holds at most `max_entries` URLs; when it grows past that, the
+  least recently checked 1% are evicted in one batch
+- redirects are followed, like the GET of fetch_status, so both report the
+  status of the final URL
+
+`stats()` reports the hit ratio (304 answers per lookup) and the body
+bytes that were not downloaded.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from budwing.clean.concurrency.pattern.pooled_fetcher import PooledFetcher
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY, status INTEGER, etag TEXT,"
+            " last_modified TEXT, length INTEGER, checked_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS by_age ON responses (checked_at)")
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        """Returns (status, etag, last_modified, length) or None."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT status, etag, last_modified, length FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url: str, status: int, etag: str, last_modified: str, length: int) -> None:
+        with self._lock, self._db:
+            known = self._db.execute("SELECT 1 FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, status, etag, last_modified, length, time.time()),
+            )
+            if not known:
+                self._count += 1
+            if self._count > self.max_entries:
+                # evict a batch of the oldest, so this doesn't happen on every put
+                evicted = self._db.execute(
+                    "DELETE FROM responses WHERE url IN ("
+                    " SELECT url FROM responses ORDER BY checked_at LIMIT ?)",
+                    (self._count - self.max_entries + max(1, self.max_entries // 100),),
+                ).rowcount
+                self._count -= evicted
+
+    def touch(self, url: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("UPDATE responses SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class CachingFetcher:
+    def __init__(self, cache: ResponseCache, session: requests.Session = None, timeout: int = 5):
+        self.cache = cache
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_saved = 0
+
+    def _request(self, url: str, headers: dict) -> requests.Response:
+        # Session.head doesn't follow redirects by default, requests.get does
+        response = self._session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        if response.status_code in (405, 501):
+            # HEAD not supported, GET without reading the body
+            response = self._session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            response.close()
+        return response
+
+    def fetch_status(self, url: str) -> dict:
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            _, etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        try:
+            response = self._request(url, headers)
+        except Exception as e:
+            return {"url": url, "status": None, "error": str(e)}
+
+        length = int(response.headers.get("Content-Length") or 0)
+        with self._lock:
+            self.lookups += 1
+            if response.status_code == 304 and cached:
+                self.hits += 1
+                self.bytes_saved += cached[3]
+            else:
+                self.bytes_saved += length
+
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            return {"url": url, "status": cached[0], "error": None}
+
+        self.cache.put(
+            url,
+            response.status_code,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            length,
+        )
+        return {"url": url, "status": response.status_code, "error": None}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hit_ratio": self.hits / self.lookups if self.lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+def main(rounds: int = 3, n: int = 200):
+    with StubServer() as server, PooledFetcher(max_workers=8) as pooled, \
+            tempfile.TemporaryDirectory() as tmp:
+        urls = [server.url(f"/page/{i}?size=100000") for i in range(n)]
+        cache = ResponseCache(os.path.join(tmp, "status_cache.sqlite3"))
+        fetcher = CachingFetcher(cache, session=pooled.session)
+
+        for round_ in range(rounds):
+            start = time.time()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                plain = list(executor.map(pooled.fetch_status, urls))
+            plain_time = time.time() - start
+
+            start = time.time()
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                cached = list(executor.map(fetcher.fetch_status, urls))
+            cached_time = time.time() - start
+
+            assert [r["status"] for r in plain] == [r["status"] for r in cached]
+            print(f"round {round_ + 1}: full GET {plain_time:.2f}s, cached {cached_time:.2f}s, {fetcher.stats()}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+An inter-process queue backed by a shared memory ring buffer.
+
+multiprocessing.Queue pickles every item, hands it to a feeder thread and
+writes it to a pipe, the reader does a read syscall and unpickles. For
+small items that overhead is most of the cost.
+
+SharedRingQueue keeps the items in a multiprocessing.shared_memory block
+used as a ring buffer of length-prefixed records:
+
+    | head | tail | waiters | ... [len][payload] [len][payload] ... |
+
+- head and tail are byte counters that only grow, the position in the
+  ring is the counter modulo the ring size, a record may wrap around
+- bytes payloads are copied as they are, anything else is pickled; the
+  high bit of the length tells which one it is
+- one process-shared lock guards the header, two conditions on that
+  lock wake up blocked readers and writers; the header counts the
+  blocked ones, so the (costly) notify is skipped when nobody waits
+- put_many()/get_many() move a whole batch under one lock acquisition
+
+get(timeout=...) raises queue.Empty and put(timeout=...) raises queue.Full
+like multiprocessing.Queue, so the producer() and consumer() functions of
+producer_consumer_processor.py work with it unchanged.
+"""
+
+import multiprocessing
+import pickle
+import queue
+import struct
+import time
+from multiprocessing import Process, shared_memory
+from typing import Any, Iterable
+
+from budwing.clean.concurrency.pattern import producer_consumer_processor
+
+_HEADER = struct.Struct("<QQ")    # head, tail
+_WAITERS = struct.Struct("<I")    # blocked readers at offset 16, writers at 20
+_READERS, _WRITERS = 16, 20
+_HEADER_SIZE = 24
+_RECORD = struct.Struct("<I")     # payload length, high bit set when pickled
+_PICKLED = 0x80000000
+
+
+class SharedRingQueue:
+    def __init__(self, capacity: int = 1 << 20):
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        self._owner = True
+        self._capacity = capacity
+        self._shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        self._lock = multiprocessing.Lock()
+        self._not_empty = multiprocessing.Condition(self._lock)
+        self._not_full = multiprocessing.Condition(self._lock)
+
+    def __getstate__(self):
+        return self._shm.name, self._capacity, self._lock, self._not_empty, self._not_full
+
+    def __setstate__(self, state):
+        name, self._capacity, self._lock, self._not_empty, self._not_full = state
+        self._shm = _attach(name)
+        self._owner = False
+
+    # ---- ring buffer helpers, call them with the lock held ----
+
+    def _copy_in(self, position: int, data) -> None:
+        start = _HEADER_SIZE + position % self._capacity
+        first = min(len(data), _HEADER_SIZE + self._capacity - start)
+        buf = self._shm.buf
+        buf[start:start + first] = data[:first]
+        if first < len(data):
+            buf[_HEADER_SIZE:_HEADER_SIZE + len(data) - first] = data[first:]
+
+    def _copy_out(self, position: int, size: int) -> bytes:
+        start = _HEADER_SIZE + position % self._capacity
+        first = min(size, _HEADER_SIZE + self._capacity - start)
+        buf = self._shm.buf
+        data = bytes(buf[start:start + first])
+        if first < size:
+            data += bytes(buf[_HEADER_SIZE:_HEADER_SIZE + size - first])
+        return data
+
+    @staticmethod
+    def _encode(item: Any) -> tuple[bytes, int]:
+        if isinstance(item, bytes):
+            return item, len(item)
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        return data, len(data) | _PICKLED
+
+    def _wait(self, condition, counter: int, ready, timeout: float, error) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ready():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise error
+            self._add_waiter(counter, 1)
+            try:
+                condition.wait(remaining)
+            finally:
+                self._add_waiter(counter, -1)
+
+    def _add_waiter(self, counter: int, delta: int) -> None:
+        (waiting,) = _WAITERS.unpack_from(self._shm.buf, counter)
+        _WAITERS.pack_into(self._shm.buf, counter, waiting + delta)
+
+    def _notify(self, condition, counter: int) -> None:
+        if _WAITERS.unpack_from(self._shm.buf, counter)[0]:
+            condition.notify_all()
+
+    # ---- public API ----
+
+    def put(self, item: Any, block: bool = True, timeout: float = None) -> None:
+        self.put_many([item], block, timeout)
+
+    def put_many(self, items: Iterable[Any], block: bool = True, timeout: float = None) -> None:
+        """Writes the items in one critical section, waiting for room for all of them."""
+        records = [self._encode(item) for item in items]
+        needed = sum(_RECORD.size + len(data) for data, _ in records)
+        if needed > self._capacity:
+            raise ValueError(f"{needed} bytes don't fit in a {self._capacity} bytes ring")
+
+        with self._lock:
+            def has_room():
+                head, tail = _HEADER.unpack_from(self._shm.buf, 0)
+                return self._capacity - (head - tail) >= needed
+            self._wait(self._not_full, _WRITERS, has_room, timeout if block else 0, queue.Full)
+
+            head, tail = _HEADER.unpack_from(self._shm.buf, 0)
+            for data, length in records:
+                self._copy_in(head, _RECORD.pack(length))
+                self._copy_in(head + _RECORD.size, data)
+                head += _RECORD.size + len(data)
+            _HEADER.pack_into(self._shm.buf, 0, head, tail)
+            self._notify(self._not_empty, _READERS)
+
+    def get(self, block: bool = True, timeout: float = None) -> Any:
+        return self.get_many(1, block, timeout)[0]
+
+    def get_many(self, max_items: int, block: bool = True, timeout: float = None) -> list:
+        """Waits for at least one item, then returns up to max_items items."""
+        with self._lock:
+            def has_items():
+                head, tail = _HEADER.unpack_from(self._shm.buf, 0)
+                return head != tail
+            self._wait(self._not_empty, _READERS, has_items, timeout if block else 0, queue.Empty)
+
+            head, tail = _HEADER.unpack_from(self._shm.buf, 0)
+            raw = []
+            while tail != head and len(raw) < max_items:
+                (length,) = _RECORD.unpack(self._copy_out(tail, _RECORD.size))
+                size = length & ~_PICKLED
+                raw.append((self._copy_out(tail + _RECORD.size, size), length & _PICKLED))
+                tail += _RECORD.size + size
+            _HEADER.pack_into(self._shm.buf, 0, head, tail)
+            self._notify(self._not_full, _WRITERS)
+
+        # unpickle outside the lock
+        return [pickle.loads(data) if pickled else data for data, pickled in raw]
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # older versions register the block again, and the resource
+        # tracker would destroy it when this process exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _produce(q, n: int, payload: bytes, batch: int) -> None:
+    if batch == 1:
+        for _ in range(n):
+            q.put(payload)
+    else:
+        for _ in range(n // batch):
+            q.put_many([payload] * batch)
+    q.put(None)
+
+
+def _consume(q, batch: int) -> int:
+    count = 0
+    while True:
+        items = q.get_many(batch) if batch > 1 else [q.get()]
+        for item in items:
+            if item is None:
+                return count
+            count += 1
+
+
+def benchmark(n: int = 100_000):
+    for label, size in (("small", 16), ("large", 64 * 1024)):
+        payload = b"x" * size
+        count = n if size < 1024 else n // 20
+        print(f"{count} {label} items of {size} bytes")
+        for name, make, batch in (
+            ("multiprocessing.Queue   ", multiprocessing.Queue, 1),
+            ("SharedRingQueue         ", lambda: SharedRingQueue(4 << 20), 1),
+            ("SharedRingQueue batch 32", lambda: SharedRingQueue(4 << 20), 32),
+        ):
+            if size * batch > 2 << 20:
+                continue
+            q = make()
+            producer = Process(target=_produce, args=(q, count, payload, batch))
+            start = time.perf_counter()
+            producer.start()
+            received = _consume(q, batch)
+            producer.join()
+            elapsed = time.perf_counter() - start
+            print(f"  {name}: {received / elapsed:>9.0f} items/s, {received * size / elapsed / 1e6:>7.1f} MB/s")
+            if isinstance(q, SharedRingQueue):
+                q.close()
+
+
+if __name__ == "__main__":
+    # the functions of producer_consumer_processor.py take it as a drop-in
+    q = SharedRingQueue()
+    p1 = Process(target=producer_consumer_processor.producer, args=(q,))
+    p2 = Process(target=producer_consumer_processor.consumer, args=(q,))
+    p1.start()
+    p2.start()
+    p1.join()
+    p2.join()
+    q.close()
+
+    benchmark()
@@ -0,0 +1,190 @@
+"""
+A FIFO queue that spills to disk instead of blocking the producer.
+
+With queue.Queue(maxsize=5) in producer_consumer.py, a burst makes q.put()
+block, and the stall travels upstream. For bursty ingest it's better to
+absorb the burst: SpillQueue.put() never blocks.
+
+- up to `memory_limit` items are kept in memory (a deque)
+- beyond that, items are pickled and appended to a log on disk, made of
+  fixed-size segment files written and read through mmap
+- once something is on disk, every new item goes to disk too, until the
+  disk is drained, so the FIFO order holds across memory and disk
+- a segment is deleted as soon as every record in it has been read
+
+The log is only an overflow area, not a durable queue: the segment index
+lives in memory and the files are removed by close().
+
+It has the queue.Queue interface used by producer_consumer.py, including
+task_done() and join(); put() accepts block and timeout and ignores them.
+"""
+
+import mmap
+import os
+import pickle
+import queue
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any
+
+_LENGTH = struct.Struct("<I")
+
+
+class _Segment:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        with open(path, "w+b") as f:
+            f.truncate(size)
+            self.map = mmap.mmap(f.fileno(), size)
+        self.write_pos = 0
+        self.read_pos = 0
+
+    def room(self) -> int:
+        return self.size - self.write_pos
+
+    def append(self, data: bytes) -> None:
+        end = self.write_pos + _LENGTH.size + len(data)
+        _LENGTH.pack_into(self.map, self.write_pos, len(data))
+        self.map[self.write_pos + _LENGTH.size:end] = data
+        self.write_pos = end
+
+    def read(self) -> bytes:
+        (length,) = _LENGTH.unpack_from(self.map, self.read_pos)
+        start = self.read_pos + _LENGTH.size
+        self.read_pos = start + length
+        return self.map[start:self.read_pos]
+
+    def remove(self) -> None:
+        self.map.close()
+        os.remove(self.path)
+
+
+class SpillQueue:
+    def __init__(self, memory_limit: int = 10_000, directory: str = None, segment_size: int = 16 << 20):
+        self.memory_limit = memory_limit
+        self.segment_size = segment_size
+        self._own_directory = directory is None
+        self._directory = directory or tempfile.mkdtemp(prefix="spill-")
+        self._memory = deque()
+        self._segments: deque[_Segment] = deque()
+        self._on_disk = 0
+        self._segment_seq = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._all_tasks_done = threading.Condition(self._lock)
+        self._unfinished_tasks = 0
+        self.spilled = 0
+        self.segments_removed = 0
+
+    def qsize(self) -> int:
+        with self._lock:
+            return len(self._memory) + self._on_disk
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def put(self, item: Any, block: bool = True, timeout: float = None) -> None:
+        """Never blocks: the item goes to memory, or to disk when memory is full."""
+        with self._lock:
+            if self._on_disk or len(self._memory) >= self.memory_limit:
+                self._spill(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+            else:
+                self._memory.append(item)
+            self._unfinished_tasks += 1
+            self._not_empty.notify()
+
+    def put_nowait(self, item: Any) -> None:
+        self.put(item)
+
+    def task_done(self) -> None:
+        """Like queue.Queue.task_done: one call per item taken with get()."""
+        with self._lock:
+            if self._unfinished_tasks <= 0:
+                raise ValueError("task_done() called too many times")
+            self._unfinished_tasks -= 1
+            if self._unfinished_tasks == 0:
+                self._all_tasks_done.notify_all()
+
+    def join(self) -> None:
+        """Blocks until every item put has been marked done with task_done()."""
+        with self._all_tasks_done:
+            while self._unfinished_tasks:
+                self._all_tasks_done.wait()
+
+    def _spill(self, data: bytes) -> None:
+        needed = _LENGTH.size + len(data)
+        if not self._segments or self._segments[-1].room() < needed:
+            path = os.path.join(self._directory, f"segment-{self._segment_seq:08d}.log")
+            self._segment_seq += 1
+            self._segments.append(_Segment(path, max(self.segment_size, needed)))
+        self._segments[-1].append(data)
+        self._on_disk += 1
+        self.spilled += 1
+
+    def _unspill(self) -> Any:
+        segment = self._segments[0]
+        data = segment.read()
+        self._on_disk -= 1
+        # fully read: writes only go to the last segment, and when this is
+        # the last one the disk is drained, the next spill starts a new one
+        if segment.read_pos == segment.write_pos:
+            self._segments.popleft().remove()
+            self.segments_removed += 1
+        return pickle.loads(data)
+
+    def get(self, block: bool = True, timeout: float = None) -> Any:
+        with self._not_empty:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._memory and not self._on_disk:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    raise queue.Empty
+                self._not_empty.wait(remaining)
+            if self._memory:
+                return self._memory.popleft()
+            return self._unspill()
+
+    def get_nowait(self) -> Any:
+        return self.get(block=False)
+
+    def close(self) -> None:
+        with self._lock:
+            while self._segments:
+                self._segments.popleft().remove()
+            self._on_disk = 0
+            self._memory.clear()
+            self._unfinished_tasks = 0
+            self._all_tasks_done.notify_all()
+        if self._own_directory:
+            os.rmdir(self._directory)
+
+
+def _throughput(q, n: int, item) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        q.put(item)
+    for _ in range(n):
+        q.get()
+    return 2 * n / (time.perf_counter() - start)
+
+
+def benchmark(n: int = 200_000):
+    item = {"id": 1, "payload": "x" * 100}
+    print(f"{n} puts then {n} gets")
+    print(f"  queue.Queue                : {_throughput(queue.Queue(), n, item):>9.0f} ops/s")
+    q = SpillQueue(memory_limit=n)
+    print(f"  SpillQueue, all in memory  : {_throughput(q, n, item):>9.0f} ops/s")
+    q.close()
+    q = SpillQueue(memory_limit=n // 10, segment_size=4 << 20)
+    rate = _throughput(q, n, item)
+    print(f"  SpillQueue, 90% spilled    : {rate:>9.0f} ops/s, "
+          f"{q.spilled} spilled, {q.segments_removed} segments removed")
+    q.close()
+
+
+if __name__ == "__main__":
+    benchmark()
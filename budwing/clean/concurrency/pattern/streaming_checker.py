@@ -0,0 +1,140 @@
+"""
+Streaming version of thread_pool.main for very long URL lists.
+
+thread_pool.main submits every URL up front and keeps a future per URL,
+so memory grows with the input. stream_check() instead:
+- reads URLs lazily from a file (one per line) or any iterator
+- keeps at most `max_in_flight` requests submitted to the executor
+- writes every result as one JSON line as soon as it completes
+- records a checkpoint, the number of input lines whose results are all
+  written, so an interrupted run can resume where it stopped
+
+Results complete out of order, so the checkpoint is a watermark: every line
+below it is done. A slow URL holds the watermark back, and the lines
+finished after it are kept in a set until it catches up. To keep that set
+bounded too, no URL further than `window` lines ahead of the watermark is
+submitted. Memory therefore depends on max_in_flight and window only.
+
+On resume, lines between the watermark and the crash point are checked
+again, so a result may appear twice in the output (at-least-once).
+"""
+
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Union
+
+from budwing.clean.concurrency.pattern.stub_server import StubServer
+from budwing.clean.concurrency.pattern.thread_pool import fetch_status
+
+
+def _read_checkpoint(path: str) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path: str, position: int) -> None:
+    # write then rename, so a crash never leaves a half written checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(position))
+    os.replace(tmp, path)
+
+
+def _lines(source: Union[str, Iterable[str]]) -> Iterable[str]:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as f:
+            for line in f:
+                yield line.strip()
+    else:
+        for url in source:
+            yield url.strip()
+
+
+def stream_check(
+    source: Union[str, Iterable[str]],
+    out_path: str,
+    checkpoint_path: str = None,
+    max_in_flight: int = 100,
+    window: int = None,
+    checkpoint_every: int = 1000,
+    fetch: Callable[[str], dict] = fetch_status,
+) -> int:
+    """
+    Check every URL of `source` and append the results to `out_path`.
+    Blank lines are skipped but still counted by the checkpoint.
+    Returns the number of results written by this run.
+    """
+    window = window or max_in_flight * 10
+    start = _read_checkpoint(checkpoint_path) if checkpoint_path else 0
+    urls = enumerate(itertools.islice(_lines(source), start, None), start)
+
+    watermark = start       # every line below it has its result written
+    finished = set()        # finished lines above the watermark
+    in_flight = {}          # future -> line index
+    written = 0
+    since_checkpoint = 0
+    exhausted = False
+
+    def advance():
+        nonlocal watermark
+        while watermark in finished:
+            finished.remove(watermark)
+            watermark += 1
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor, \
+            open(out_path, "a") as out:
+
+        def submit_more():
+            nonlocal exhausted
+            while not exhausted and len(in_flight) < max_in_flight:
+                if len(finished) + len(in_flight) >= window:
+                    return  # too far ahead of the watermark
+                index, url = next(urls, (None, None))
+                if index is None:
+                    exhausted = True
+                elif not url:
+                    finished.add(index)
+                    advance()
+                else:
+                    in_flight[executor.submit(fetch, url)] = index
+
+        submit_more()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                out.write(json.dumps(future.result()) + "\n")
+                finished.add(in_flight.pop(future))
+            written += len(done)
+            since_checkpoint += len(done)
+            advance()
+
+            if checkpoint_path and since_checkpoint >= checkpoint_every:
+                out.flush()  # results must reach the file before the checkpoint
+                _write_checkpoint(checkpoint_path, watermark)
+                since_checkpoint = 0
+            submit_more()
+
+        out.flush()
+        if checkpoint_path:
+            _write_checkpoint(checkpoint_path, watermark)
+
+    return written
+
+
+def main():
+    with StubServer() as server:
+        # a generator, so the URL list is never materialized
+        urls = (server.url(f"/status/{200 + i % 3}") for i in range(5000))
+        start = time.time()
+        written = stream_check(urls, "results.jsonl", "results.checkpoint", max_in_flight=20)
+        print(f"{written} results written in {time.time() - start:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
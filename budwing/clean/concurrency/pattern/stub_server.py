@@ -0,0 +1,166 @@
+"""
+A local stub HTTP server used to benchmark the URL fetchers offline.
+
+It mimics the two httpbin.org endpoints used by thread_pool.py:
+  /delay/<seconds>   answers 200 after sleeping <seconds>
+  /status/<code>     answers immediately with <code>
+Any other path answers 200. The query string can override both knobs,
+e.g. /anything?delay=0.05&status=503, and inject tail latency:
+/delay/0.01?tail=0.05&tail_delay=1 makes 5% of the requests take 1 second.
+?size=<bytes> sets the body size. Every 200 carries an ETag and a
+Last-Modified header, and conditional requests are answered with 304.
+HEAD is supported too.
+
+With a `capacity`, the server has a latency knee: once more than
+`capacity` requests are in progress, every delay grows with the square of
+the overload, so pushing more requests lowers the throughput. The capacity can be changed while the server runs.
+
+The server speaks HTTP/1.1 with Content-Length, so clients that keep
+connections alive (pooled sessions) can reuse them between requests.
+"""
+
+import random
+import threading
+import time
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without TCP_NODELAY a
+    # kept-alive connection stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _parse(self) -> tuple[float, int]:
+        parts = urlsplit(self.path)
+        delay, status = 0.0, 200
+        segments = [s for s in parts.path.split("/") if s]
+        if len(segments) == 2 and segments[0] == "delay":
+            delay = float(segments[1])
+        elif len(segments) == 2 and segments[0] == "status":
+            status = int(segments[1])
+
+        query = parse_qs(parts.query)
+        if "delay" in query:
+            delay = float(query["delay"][0])
+        if "status" in query:
+            status = int(query["status"][0])
+        if "tail" in query and random.random() < float(query["tail"][0]):
+            delay = float(query.get("tail_delay", ["1"])[0])
+        return delay, status
+
+    def _overload(self, delay: float, status: int) -> tuple[float, int]:
+        capacity = self.server.capacity
+        if not capacity:
+            return delay, status
+        load = self.server.active / capacity
+        return delay * max(1.0, load) ** 2, status
+
+    def _respond(self, send_body: bool) -> None:
+        with self.server.lock:
+            self.server.active += 1
+        try:
+            delay, status = self._overload(*self._parse())
+            if delay > 0:
+                time.sleep(delay)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+        size = int(parse_qs(urlsplit(self.path).query).get("size", ["3"])[0])
+        etag = '"%08x"' % zlib.crc32(self.path.encode())
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, size = 304, 0
+        elif status == 200 and self.headers.get("If-Modified-Since") == self.server.last_modified:
+            status, size = 304, 0
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(size))
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.server.last_modified)
+        self.end_headers()
+        if send_body and size:
+            self.wfile.write(b"o" * size)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the socketserver default backlog of 5 drops connections when
+    # hundreds of clients connect at once
+    request_queue_size = 1024
+
+    def __init__(self, address, handler, capacity: int = None):
+        super().__init__(address, handler)
+        self.capacity = capacity
+        self.active = 0  # requests in progress
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        self.lock = threading.Lock()
+
+
+class StubServer:
+    """
+    Runs a StubHandler server on a background thread.
+
+    Use it as a context manager, the port is picked by the OS:
+
+        with StubServer() as server:
+            requests.get(server.url("/delay/0.1"))
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, capacity: int = None):
+        self._httpd = _StubHTTPServer((host, port), StubHandler, capacity)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    @property
+    def capacity(self) -> int:
+        return self._httpd.capacity
+
+    @capacity.setter
+    def capacity(self, capacity: int) -> None:
+        self._httpd.capacity = capacity
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    with StubServer(port=8000) as server:
+        print(f"Stub server listening on {server.base_url}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -3,9 +3,13 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import time
 
 # simulate IO bound task
-def fetch_status(url: str, timeout: int = 5) -> dict:
+def fetch_status(url: str, timeout: int = 5, session: requests.Session = None) -> dict:
+    """
+    Pass a shared session to reuse kept-alive connections, see pooled_fetcher.py
+    """
     try:
-        response = requests.get(url, timeout=timeout)
+        getter = session.get if session is not None else requests.get
+        response = getter(url, timeout=timeout)
         return {"url": url, "status": response.status_code, "error": None}
     except Exception as e:
         return {"url": url, "status": None, "error": str(e)}
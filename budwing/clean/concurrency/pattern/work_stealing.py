@@ -0,0 +1,200 @@
+"""
+A work-stealing thread executor.
+
+All the consumers in producer_consumer.py (and all the workers of a
+ThreadPoolExecutor) take their items from one shared queue, so they all
+contend on its lock. WorkStealingExecutor gives every worker its own deque:
+
+- a task submitted from outside goes to the deques round-robin
+- a task submitted by a task (a worker thread) goes to that worker's own
+  deque, so the work it spawns stays local
+- a worker pops from the tail of its own deque (newest first, its data is
+  still warm) and, when empty, steals from the head of another worker's
+  deque (oldest first, usually the biggest pieces of work)
+
+deque.append/pop/popleft are atomic in CPython, so taking a task needs no
+lock at all. Submitting takes the condition, which idle workers also use
+to sleep until new work arrives, so that no task slips in after shutdown.
+"""
+
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+
+class WorkStealingExecutor:
+    def __init__(self, max_workers: int = 4):
+        self._deques = [deque() for _ in range(max_workers)]
+        self._round_robin = itertools.count()
+        self._local = threading.local()
+        self._idle = 0
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self.steals = [0] * max_workers
+        self._threads = [
+            threading.Thread(target=self._work, args=(i,), name=f"stealer-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        index = getattr(self._local, "index", None)
+        if index is None:
+            index = next(self._round_robin) % len(self._deques)
+        # check and append under the condition, like ThreadPoolExecutor's
+        # shutdown lock: a task appended after the workers saw _shutdown
+        # would never run
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._deques[index].append((future, fn, args, kwargs))
+            if self._idle:
+                self._condition.notify()
+        return future
+
+    def _find_task(self, index: int):
+        try:
+            return self._deques[index].pop()
+        except IndexError:
+            pass
+        n = len(self._deques)
+        start = random.randrange(n)
+        for offset in range(n):
+            victim = (start + offset) % n
+            if victim == index:
+                continue
+            try:
+                task = self._deques[victim].popleft()
+            except IndexError:
+                continue
+            self.steals[index] += 1
+            return task
+        return None
+
+    def _work(self, index: int) -> None:
+        self._local.index = index
+        while True:
+            task = self._find_task(index)
+            if task is None:
+                with self._condition:
+                    self._idle += 1
+                    try:
+                        task = self._find_task(index)  # look again, now that we count as idle
+                        if task is None:
+                            if self._shutdown:
+                                return
+                            self._condition.wait()
+                            continue
+                    finally:
+                        self._idle -= 1
+
+            future, fn, args, kwargs = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers once every submitted task is done."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def __enter__(self) -> "WorkStealingExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+def _single_queue(tasks: list, workers: int) -> None:
+    """The producer_consumer.py way: one shared queue, poison pills at the end."""
+    q = queue.Queue()
+
+    def consumer():
+        while (task := q.get()) is not None:
+            task()
+
+    threads = [threading.Thread(target=consumer) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for task in tasks:
+        q.put(task)
+    for _ in threads:
+        q.put(None)
+    for t in threads:
+        t.join()
+
+
+def _executor(executor, tasks: list) -> None:
+    wait([executor.submit(task) for task in tasks])
+
+
+def _spawning(executor, depth: int):
+    """A task that spawns two subtasks, like a recursive divide and conquer."""
+    if depth == 0:
+        return 1
+    left = executor.submit(_spawning, executor, depth - 1)
+    right = executor.submit(_spawning, executor, depth - 1)
+    return (left, right)
+
+
+def _run_tree(executor, depth: int) -> int:
+    # never block a worker on its own subtasks: walk the futures from outside
+    count, pending = 0, [executor.submit(_spawning, executor, depth)]
+    while pending:
+        result = pending.pop().result()
+        if isinstance(result, tuple):
+            pending.extend(result)
+        else:
+            count += result
+    return count
+
+
+def benchmark(workers: int = 4, n: int = 20_000):
+    # skewed durations: most tasks are tiny, a few sleep (I/O or a C extension releasing the GIL)
+    def tiny():
+        pass
+
+    def slow():
+        time.sleep(0.005)
+
+    tasks = [slow if i % 100 == 0 else tiny for i in range(n)]
+    print(f"{n} tasks (1% take 5ms), {workers} workers")
+
+    start = time.perf_counter()
+    _single_queue(tasks, workers)
+    print(f"  single queue consumers: {time.perf_counter() - start:.2f}s")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        _executor(executor, tasks)
+        print(f"  ThreadPoolExecutor    : {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        leaves = _run_tree(executor, 12)
+        print(f"  ThreadPoolExecutor    : {time.perf_counter() - start:.2f}s for a tree of {leaves} leaves")
+
+    with WorkStealingExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        _executor(executor, tasks)
+        print(f"  WorkStealingExecutor  : {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        leaves = _run_tree(executor, 12)
+        print(f"  WorkStealingExecutor  : {time.perf_counter() - start:.2f}s for a tree of {leaves} leaves,"
+              f" steals per worker {executor.steals}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -4,8 +4,16 @@ import time
 
 import logging
 
+from budwing.clean.concurrency.backoff import BackoffPolicy, ExponentialBackoff
+from budwing.clean.concurrency.keyed_lock import AsyncKeyedLock, KeyedLock
+
 logger = logging.getLogger(__name__)
 
+# locks by username, created only while a user is locked,
+# instead of a threading.Lock and an asyncio.Lock in every User
+user_locks = KeyedLock()
+async_user_locks = AsyncKeyedLock()
+
 class Counter:
     """
     Counter class to demonstrate concurrent access to shared data.
@@ -37,16 +45,41 @@ class User:
     def __init__(self, username, balance=0.0):
         self.username = username
         self._balance = balance
-        # lock for thread
-        self._lock = threading.Lock()
-        # lock for coroutine
-        self._async_lock = asyncio.Lock()
+        # bumped by every committed change, see compare_and_set
+        self._version = 0
     
     def get_balance(self):
         return self._balance
     
     def set_balance(self, balance):
+        with user_locks.lock(self.username):
+            self._commit(balance)
+
+    def _commit(self, balance):
+        """
+        Every write goes through here, so compare_and_set sees it.
+        The caller holds the user's lock.
+        """
         self._balance = balance
+        self._version += 1
+
+    def get_versioned_balance(self):
+        """
+        Returns (balance, version) as one consistent snapshot.
+        """
+        with user_locks.lock(self.username):
+            return self._balance, self._version
+
+    def compare_and_set(self, expected_version, balance):
+        """
+        Sets the balance only if nobody committed since expected_version was read.
+        The lock is held just for the check and the assignment, never across I/O.
+        """
+        with user_locks.lock(self.username):
+            if self._version != expected_version:
+                return False
+            self._commit(balance)
+            return True
 
 
 class RaceCondition:
@@ -100,26 +133,65 @@ class RaceCondition:
 
         return cls._instance
     
-    def withdraw(self, user: User, amount):
+    def withdraw(self, user: User, amount, io_time=0.1):
         """
         Demonstrates race condition in withdrawal operation.
         
         Check and act pattern that can cause issues in concurrent environment.
+        Returns True when the withdrawal is committed.
         """
-        with user._lock:
+        with user_locks.lock(user.username):
             # check and act
             if user.get_balance() >= amount:
                 # Simulate some processing time that could allow context switching
                 # This makes the race condition more likely to occur
-                time.sleep(0.1)
+                time.sleep(io_time)
                 
-                user.set_balance(user.get_balance() - amount)
+                user._commit(user.get_balance() - amount)  # the lock is already held
                 logger.info(f"{threading.current_thread().name} withdraw {amount} successfully, "
                     f"balance: {user.get_balance()}")
+                return True
             else:
                 logger.info(f"{threading.current_thread().name} withdraw failed, insufficient funds. "
                     f"Balance: {user.get_balance()}, Attempt: {amount}")
+                return False
             
+    def withdraw_optimistic(self, user: User, amount, io_time=0.1, max_retries=10,
+                            backoff: BackoffPolicy = None):
+        """
+        Optimistic concurrency control: no lock is held across the slow work.
+
+        Read the balance and its version, do the slow work (the database
+        round trip) outside the lock, then commit only if the version didn't
+        change in between, like UPDATE ... WHERE version = ? does in SQL.
+        If somebody else committed first, back off and start over, at most
+        max_retries times. The default backoff is exponential with full
+        jitter, capped at 10 * io_time.
+        Returns True when the withdrawal is committed.
+        """
+        backoff = backoff or ExponentialBackoff(base=io_time, cap=10 * io_time)
+        attempt = 0
+        while True:
+            balance, version = user.get_versioned_balance()
+            if balance < amount:
+                logger.info(f"{threading.current_thread().name} withdraw failed, insufficient funds. "
+                    f"Balance: {balance}, Attempt: {amount}")
+                return False
+
+            time.sleep(io_time)  # slow work, other threads are not blocked
+
+            if user.compare_and_set(version, balance - amount):
+                return True
+            if attempt >= max_retries:
+                break
+            # a conflict: another withdrawal committed since our read,
+            # back off a random while so the losers don't collide again
+            time.sleep(backoff.delay(attempt))
+            attempt += 1
+
+        logger.info(f"{threading.current_thread().name} withdraw gave up after {max_retries} retries")
+        return False
+
     async def withdraw_async(self, user: User, amount):
         """
         For coroutines, we can use asyncio.Lock() to prevent race condition.
@@ -128,13 +200,15 @@ class RaceCondition:
         Other threads can still access the shared data at the same time.
         """
         
-        async with user._async_lock:
+        async with async_user_locks.lock(user.username):
             # check and act
             if user.get_balance() >= amount:
                 # Simulate some processing time that could allow context switching
                 # This makes the race condition more likely to occur
                 await asyncio.sleep(0.1) # for example, database update
-                user.set_balance(user.get_balance() - amount)
+                # not set_balance: its threading lock would block the event loop
+                # while a thread holds it (see dead_lock.save)
+                user._commit(user.get_balance() - amount)
 
 
 def main():
@@ -160,9 +234,54 @@ def main():
     
     logger.info(f"Final balance: {alice.get_balance()}")
 
+def contention_benchmark(io_time=0.002):
+    """
+    Many threads withdrawing from one hot account: locked vs optimistic.
+
+    On a single hot account almost every optimistic attempt conflicts, so
+    the lock gets more withdrawals done. What the optimistic version buys
+    is that the lock is never held across I/O: a reader of the balance
+    waits microseconds instead of a whole database round trip.
+    """
+    r = RaceCondition.get_instance()
+    logger.setLevel(logging.WARNING)
+    for threads_count in (5, 50, 500):
+        for name, withdraw in (("locked", r.withdraw), ("optimistic", r.withdraw_optimistic)):
+            hot = User("Hot", float(threads_count))
+            committed = []
+            read_waits = []
+            done = threading.Event()
+
+            def run():
+                if withdraw(hot, 1.0, io_time=io_time):
+                    committed.append(1)
+
+            def read():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    hot.get_versioned_balance()
+                    read_waits.append(time.perf_counter() - start)
+                    time.sleep(io_time)
+
+            reader = threading.Thread(target=read)
+            threads = [threading.Thread(target=run) for _ in range(threads_count)]
+            start = time.perf_counter()
+            reader.start()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            done.set()
+            reader.join()
+            print(f"{threads_count:>3} threads, {name:<10}: {elapsed:.2f}s, "
+                  f"{len(committed)} committed, final balance {hot.get_balance()}, "
+                  f"max balance read wait {max(read_waits) * 1000:.2f}ms")
+
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO, 
         format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
     )
-    main()
\ No newline at end of file
+    main()
+    # contention_benchmark()
\ No newline at end of file
@@ -0,0 +1,234 @@
+import array
+import bisect
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, wait
+
+from budwing.clean.concurrency.ledger import per_operation_locking
+
+logger = logging.getLogger(__name__)
+
+
+class _Transfer:
+    """One transfer on its way through the shards."""
+    def __init__(self, source, target, amount):
+        self.future = Future()
+        self.source = source
+        self.target = target
+        self.amount = amount
+        self.debited = False
+        self.error = None  # set when the debit is being compensated
+
+
+class _Shard:
+    """
+    One thread that owns a slice of the balances. Nobody else writes them,
+    so applying an operation needs no lock: operations are applied one by
+    one, in the order of the shard's queue.
+    An operation that raises is handed to on_error, the thread goes on.
+    """
+    def __init__(self, index, balances, io_time, on_error):
+        self.balances = array.array("d", balances)
+        self.queue = queue.Queue()
+        self.io_time = io_time
+        self.on_error = on_error
+        self.operations = 0
+        self._thread = threading.Thread(target=self._run, name=f"shard-{index}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while (operation := self.queue.get()) is not None:
+            handler, transfer = operation
+            try:
+                handler(self, transfer)
+            except Exception as e:
+                self.on_error(self, transfer, e)
+            self.operations += 1
+            time.sleep(self.io_time)  # the slow step, e.g. writing the change to the shard's database
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join()
+
+
+class ShardedLedger:
+    """
+    Transfers without account locks: the accounts are split across shards,
+    account n living in shard n % shards, and each shard is the only writer
+    of its balances.
+
+    A transfer inside one shard is a single operation of that shard.
+    A transfer between shards is done in two steps:
+    1. the source shard checks the balance and debits it, then hands the
+       credit to the target shard
+    2. the target shard credits the target account; when anything fails
+       after the debit, a refund is sent back to the source shard, which
+       gives the money back before the transfer is reported
+    Between the steps the money is in flight: it is in no balance, but it
+    is never lost nor created.
+
+    Like Ledger, transfer() returns a Future: True when done, False for
+    insufficient funds, or the error of an invalid transfer (IndexError or
+    TypeError for a bad account id, ValueError for an amount that isn't
+    positive). Invalid transfers are rejected before reaching any shard.
+    """
+    def __init__(self, balances, shards=4, io_time=0.1):
+        self.accounts = len(balances)
+        self.shards = [
+            _Shard(i, balances[i::shards], io_time, self._failed) for i in range(shards)
+        ]
+        self._in_flight = 0
+        self._closed = False
+        self._idle = threading.Condition()
+
+    def _check(self, account):
+        if not isinstance(account, int) or isinstance(account, bool):
+            raise TypeError(f"account ids are ints, not {type(account).__name__}")
+        if not 0 <= account < self.accounts:
+            raise IndexError(f"no account {account}")
+
+    def _locate(self, account):
+        self._check(account)
+        return self.shards[account % len(self.shards)], account // len(self.shards)
+
+    def balance(self, account):
+        # a single float read, the owner may be writing it right now: fine for a snapshot
+        shard, slot = self._locate(account)
+        return shard.balances[slot]
+
+    def transfer(self, source, target, amount) -> Future:
+        transfer = _Transfer(source, target, amount)
+        try:
+            self._check(source)
+            self._check(target)
+            if not amount > 0:
+                raise ValueError(f"amount must be positive, got {amount}")
+        except (TypeError, IndexError, ValueError) as e:
+            transfer.future.set_exception(e)
+            return transfer.future
+        with self._idle:
+            if self._closed:
+                raise RuntimeError("cannot transfer after close()")
+            self._in_flight += 1
+        transfer.future.add_done_callback(self._done)
+        source_shard, _ = self._locate(source)
+        source_shard.queue.put((self._debit, transfer))
+        return transfer.future
+
+    def _done(self, future):
+        with self._idle:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.notify_all()
+
+    def _debit(self, shard, transfer):
+        _, slot = self._locate(transfer.source)
+        if shard.balances[slot] < transfer.amount:
+            transfer.future.set_result(False)
+            return
+        shard.balances[slot] -= transfer.amount
+        transfer.debited = True
+        target_shard, _ = self._locate(transfer.target)
+        if target_shard is shard:
+            self._credit(shard, transfer)
+        else:
+            target_shard.queue.put((self._credit, transfer))
+
+    def _credit(self, shard, transfer):
+        _, slot = self._locate(transfer.target)
+        shard.balances[slot] += transfer.amount
+        transfer.future.set_result(True)
+
+    def _refund(self, shard, transfer):
+        """The compensation of a debit whose credit failed."""
+        _, slot = self._locate(transfer.source)
+        shard.balances[slot] += transfer.amount
+        transfer.debited = False
+        transfer.future.set_exception(transfer.error)
+
+    def _failed(self, shard, transfer, error):
+        """A step of the transfer raised in a shard: refund the debit, if any, then fail."""
+        if transfer.future.done():
+            return
+        if not transfer.debited or transfer.error is not None:
+            # nothing to give back, or the refund itself failed
+            if transfer.error is not None:
+                logger.error(f"refund of {transfer.amount} to account {transfer.source} failed: {error!r}")
+            transfer.future.set_exception(error)
+            return
+        transfer.error = error
+        source_shard, _ = self._locate(transfer.source)
+        if source_shard is shard:
+            self._refund(shard, transfer)
+        else:
+            source_shard.queue.put((self._refund, transfer))
+
+    def close(self):
+        """Applies what is queued and stops the shards; transfer() raises afterwards."""
+        # a stopped shard can't take the credits and refunds of the others:
+        # wait until every transfer is done before stopping any of them
+        with self._idle:
+            self._closed = True
+            self._idle.wait_for(lambda: not self._in_flight)
+        for shard in self.shards:
+            shard.stop()
+
+
+def zipf_accounts(accounts, s=1.0):
+    """An endless stream of account numbers, account n picked with a weight of 1 / (n + 1) ** s."""
+    cumulative = list(itertools.accumulate(1 / (n + 1) ** s for n in range(accounts)))
+    total = cumulative[-1]
+    while True:
+        yield bisect.bisect_left(cumulative, random.random() * total)
+
+
+def benchmark(transfers=2000, accounts=1000, clients=32, io_time=0.001):
+    picks = zipf_accounts(accounts)
+    moves = []
+    while len(moves) < transfers:
+        source, target = next(picks), next(picks)
+        if source != target:
+            moves.append((source, target, 1.0))
+
+    balances = [1000.0] * accounts
+    locks = [threading.Lock() for _ in range(accounts)]
+    work = iter(moves)
+    work_lock = threading.Lock()
+
+    def client():
+        while True:
+            with work_lock:
+                move = next(work, None)
+            if move is None:
+                return
+            per_operation_locking(balances, locks, *move, io_time)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.info(f"account locks, {clients} clients: {transfers / (time.perf_counter() - start):.0f} transfers/s")
+
+    for shards in (1, 2, 4, 8, 16):
+        ledger = ShardedLedger([1000.0] * accounts, shards=shards, io_time=io_time)
+        start = time.perf_counter()
+        wait([ledger.transfer(*move) for move in moves])
+        elapsed = time.perf_counter() - start
+        total = sum(ledger.balance(n) for n in range(accounts))
+        logger.info(f"{shards:>2} shards: {transfers / elapsed:.0f} transfers/s, "
+                    f"busiest shard {max(s.operations for s in ledger.shards)} operations, total {total:.0f}")
+        ledger.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(filename)s %(levelname)s:%(message)s"
+    )
+    benchmark()
@@ -1,4 +1,8 @@
 import asyncio
+import time
+
+from budwing.clean.concurrency.cooperative import time_sliced
+
 async def cpu_bound_task():
     total = 0
     times = 1_000_000_000 # increase this number if the other thread has no starvation.
@@ -10,15 +14,31 @@ async def cpu_bound_task():
     print("Finished")
     return total
 
+async def cpu_bound_task_sliced():
+    """
+    The same loop, giving the event loop a turn every 5ms instead of
+    every 1,000,000 iterations, whatever the speed of the CPU.
+    """
+    total = 0
+    times = 1_000_000_000
+
+    async for chunk in time_sliced(range(times), time_slice=0.005):
+        for i in chunk:
+            total += i * i
+    print("Finished")
+    return total
+
 async def heartbeat():
     while True:
-        print("Still alive!")
+        start = time.perf_counter()
         await asyncio.sleep(1)
+        print(f"Still alive! ({time.perf_counter() - start:.3f}s since the last beat)")
 
 async def main():
-    task = asyncio.create_task(cpu_bound_task())
+    # task = asyncio.create_task(cpu_bound_task())
+    task = asyncio.create_task(cpu_bound_task_sliced())
     await heartbeat()
     await task
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import threading
+from contextlib import contextmanager
+
+
+class StripedLocks:
+    """
+    A fixed-size table of locks shared by any number of accounts.
+
+    An account id is hashed to one of `stripes` locks, so the memory for
+    locks stays the same for a thousand or for millions of accounts. Two
+    accounts may share a stripe; that costs a little extra contention, but
+    never correctness.
+
+    locked(*keys) locks several accounts at once, deadlock free:
+    - the stripes are acquired in one canonical order (ascending index), so
+      two threads can never hold each other's next lock, whatever the
+      order of the accounts in the call
+    - a stripe that appears twice (the same account twice, or two accounts
+      hashed to the same stripe) is acquired only once, threading.Lock is
+      not reentrant and would deadlock on itself
+    """
+    def __init__(self, stripes=1024):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def stripe(self, key) -> int:
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def locked(self, *keys):
+        stripes = sorted({self.stripe(key) for key in keys})
+        acquired = []
+        try:
+            for index in stripes:
+                self._locks[index].acquire()
+                acquired.append(index)
+            yield
+        finally:
+            for index in reversed(acquired):
+                self._locks[index].release()
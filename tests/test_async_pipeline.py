@@ -0,0 +1,37 @@
+import asyncio
+
+from budwing.clean.concurrency.pattern.async_pipeline import AsyncPipeline
+
+
+def test_eager_run_restores_the_task_factory():
+    def factory(loop, coro, **kwargs):
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_task_factory(factory)
+        pipeline = AsyncPipeline().add_stage("double", lambda x: x * 2, workers=2)
+        results = await pipeline.run(range(10), eager=True)
+        return sorted(results), loop.get_task_factory()
+
+    results, factory_after = asyncio.run(main())
+    assert results == [x * 2 for x in range(10)]
+    assert factory_after is factory
+
+
+class AsyncIncrement:
+    async def __call__(self, x):
+        await asyncio.sleep(0)
+        return x + 1
+
+
+def test_callable_objects_with_async_call_are_awaited():
+    pipeline = AsyncPipeline().add_stage("increment", AsyncIncrement(), workers=2)
+    assert sorted(asyncio.run(pipeline.run(range(5)))) == [1, 2, 3, 4, 5]
+
+
+def test_pipeline_runs_again_with_fresh_counters():
+    pipeline = AsyncPipeline().add_stage("double", lambda x: x * 2, workers=3)
+    asyncio.run(pipeline.run(range(10)))
+    assert sorted(asyncio.run(pipeline.run(range(4)))) == [0, 2, 4, 6]
+    assert pipeline.stages[0].processed == 4
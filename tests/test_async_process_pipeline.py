@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from budwing.clean.concurrency.pattern.async_process_pipeline import ProcessOffloader
+
+
+def test_producer_is_held_back_at_max_in_flight():
+    release = threading.Event()
+
+    def work(item):
+        release.wait(5)
+        return item * 2
+
+    async def main():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            offloader = ProcessOffloader(work, executor, max_in_flight=2)
+            futures = []
+
+            async def producer():
+                for i in range(5):
+                    futures.append(await offloader.submit(i))
+
+            task = asyncio.create_task(producer())
+            await asyncio.sleep(0.1)
+            held = (offloader.submitted, offloader.in_flight, task.done())
+            release.set()
+            await task
+            return held, await asyncio.gather(*futures), offloader.max_seen
+
+    held, results, max_seen = asyncio.run(main())
+    assert held == (2, 2, False)
+    assert results == [0, 2, 4, 6, 8]
+    assert max_seen == 2
+
+
+def test_failed_submit_gives_the_slot_back():
+    async def main():
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        offloader = ProcessOffloader(abs, executor, max_in_flight=1)
+        for _ in range(2):  # the second one would wait forever if the slot leaked
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(offloader.submit(-1), timeout=1)
+        return offloader.in_flight
+
+    assert asyncio.run(main()) == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from budwing.clean.concurrency.backoff import BackoffPolicy, ContentionStats, ExponentialBackoff
+from budwing.clean.concurrency.dead_lock import User, transfer_try_lock
+
+
+def test_policy_without_delay_cannot_be_created():
+    with pytest.raises(TypeError):
+        BackoffPolicy()
+
+
+def test_exponential_delay_doubles_up_to_the_cap():
+    backoff = ExponentialBackoff(base=0.01, cap=0.05, jitter=False)
+    assert [backoff.delay(n) for n in range(5)] == [0.01, 0.02, 0.04, 0.05, 0.05]
+
+
+def test_jitter_stays_under_the_ceiling():
+    backoff = ExponentialBackoff(base=0.01, cap=0.05)
+    for attempt in range(6):
+        delays = [backoff.delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= min(0.05, 0.01 * 2 ** attempt) for d in delays)
+        assert len(set(delays)) > 1
+
+
+def test_budgets():
+    assert ExponentialBackoff().allows(1000, 1000.0)
+    retries = ExponentialBackoff(max_retries=3)
+    assert retries.allows(2, 0.0) and not retries.allows(3, 0.0)
+    wait = ExponentialBackoff(max_wait=0.5)
+    assert wait.allows(100, 0.4) and not wait.allows(0, 0.5)
+
+
+def test_try_lock_gives_up_when_the_budget_is_spent():
+    alice, bob = User("Alice", 100), User("Bob", 100)
+    stats = ContentionStats()
+    bob._lock.acquire()  # somebody else holds the target for good
+    try:
+        done = transfer_try_lock(alice, bob, 10, ExponentialBackoff(base=0.001, max_retries=2),
+                                 stats, work_time=0)
+    finally:
+        bob._lock.release()
+    assert not done
+    assert (alice.balance, bob.balance) == (100, 100)
+    assert stats.transfers == 0 and stats.retries == 2
+    assert not alice._lock.locked()
@@ -0,0 +1,62 @@
+import time
+
+from budwing.clean.concurrency.pattern.circuit_breaker import BreakerFetcher, CircuitBreaker, resolve_host
+
+
+def test_circuit_opens_after_threshold_and_recovers_after_probe():
+    calls = []
+    healthy = False
+
+    def fetch(url):
+        calls.append(url)
+        if healthy:
+            return {"url": url, "status": 200, "error": None}
+        return {"url": url, "status": None, "error": "connection refused"}
+
+    fetcher = BreakerFetcher(fetch, failure_threshold=2, reset_timeout=0.05, resolve=lambda host: None)
+    for _ in range(5):
+        fetcher.fetch_status("http://down.example/")
+
+    assert len(calls) == 2
+    assert fetcher.breaker("down.example").state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    healthy = True
+    assert fetcher.fetch_status("http://down.example/")["status"] == 200
+    assert fetcher.breaker("down.example").state == CircuitBreaker.CLOSED
+
+
+def test_unresolvable_host_is_cached():
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return {"url": url, "status": None, "error": "name resolution failed"}
+
+    def resolve(host):
+        raise OSError("Name or service not known")
+
+    fetcher = BreakerFetcher(fetch, failure_threshold=100, resolve=resolve)
+    results = [fetcher.fetch_status(f"http://nowhere.invalid/{i}") for i in range(3)]
+
+    assert len(calls) == 1
+    assert "cached" in results[-1]["error"]
+
+
+def test_raising_fetch_counts_as_a_failure_even_for_the_probe():
+    def fetch(url):
+        raise RuntimeError("boom")
+
+    fetcher = BreakerFetcher(fetch, failure_threshold=1, reset_timeout=0.05, resolve=lambda host: None)
+    assert fetcher.fetch_status("http://flaky.example/")["error"] == "boom"
+    assert fetcher.breaker("flaky.example").state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert fetcher.fetch_status("http://flaky.example/")["error"] == "boom"  # the probe raised
+    time.sleep(0.06)
+    # the breaker is not stuck half-open: a new probe goes through
+    assert fetcher.fetch_status("http://flaky.example/")["error"] == "boom"
+
+
+def test_default_resolver_accepts_ipv6_only_hosts():
+    assert resolve_host("::1")
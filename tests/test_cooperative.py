@@ -0,0 +1,22 @@
+import asyncio
+
+from budwing.clean.concurrency.cooperative import time_sliced
+
+
+async def _collect(iterable, time_slice):
+    items, chunks = [], 0
+    async for chunk in time_sliced(iterable, time_slice, initial_chunk=7):
+        items.extend(chunk)
+        chunks += 1
+    return items, chunks
+
+
+def test_chunks_cover_the_range_in_order():
+    items, chunks = asyncio.run(_collect(range(3, 10_000, 3), 0.005))
+    assert items == list(range(3, 10_000, 3))
+    assert chunks > 1
+
+
+def test_any_iterable_is_chunked():
+    items, _ = asyncio.run(_collect(iter("abcdefghijklmnop"), 0.005))
+    assert "".join(items) == "abcdefghijklmnop"
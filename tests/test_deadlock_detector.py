@@ -0,0 +1,40 @@
+import threading
+import time
+
+from budwing.clean.concurrency.deadlock_detector import DeadlockDetector
+
+
+def test_crossing_locks_are_reported_once():
+    reports = []
+    detector = DeadlockDetector(interval=0.05, on_deadlock=reports.append).start()
+    a, b = detector.lock("a"), detector.lock("b")
+    both_hold = threading.Barrier(2)
+
+    def cross(first, second):
+        with first:
+            both_hold.wait()
+            if second.acquire(timeout=1):
+                second.release()
+
+    threads = [threading.Thread(target=cross, args=(a, b), name="left"),
+               threading.Thread(target=cross, args=(b, a), name="right")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    detector.stop()
+
+    assert len(reports) == 1
+    assert "left waits for" in reports[0] and "right waits for" in reports[0]
+
+
+def test_contention_without_cycle_is_not_reported():
+    detector = DeadlockDetector()
+    lock = detector.lock("a")
+    lock.acquire()
+    waiter = threading.Thread(target=lambda: lock.acquire(timeout=0.5))
+    waiter.start()
+    time.sleep(0.1)
+    assert detector.check() == [] and detector.check() == []
+    lock.release()
+    waiter.join()
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+from budwing.clean.concurrency.keyed_lock import AsyncKeyedLock, KeyedLock
+
+
+def test_keyed_lock_excludes_same_key_and_evicts_unused_entries():
+    locks = KeyedLock()
+    counter = {"value": 0}
+
+    def work():
+        for _ in range(1000):
+            with locks.lock("alice"):
+                value = counter["value"]
+                counter["value"] = value + 1
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter["value"] == 4000
+    assert len(locks) == 0
+
+
+def test_failed_try_lock_does_not_leak_an_entry():
+    locks = KeyedLock()
+    assert locks.acquire("bob")
+    assert not locks.acquire("bob", blocking=False)
+    locks.release("bob")
+    assert len(locks) == 0
+
+
+def test_async_keyed_lock_evicts_after_cancelled_waiter():
+    locks = AsyncKeyedLock()
+
+    async def main():
+        async with locks.lock("alice"):
+            waiter = asyncio.create_task(locks.lock("alice").__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        return len(locks)
+
+    assert asyncio.run(main()) == 0
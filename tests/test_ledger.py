@@ -0,0 +1,40 @@
+import pytest
+
+from budwing.clean.concurrency.ledger import Ledger
+
+
+def test_batch_results_are_per_operation():
+    ledger = Ledger([100.0, 0.0], io_time=0)
+    futures = [
+        ledger.withdraw(0, 30),
+        ledger.transfer(0, 1, 50),
+        ledger.withdraw(1, 80),  # only 50 there
+        ledger.transfer(0, 1, 20),
+    ]
+    assert [f.result(timeout=1) for f in futures] == [True, True, False, True]
+    ledger.close()
+    assert [ledger.balance(0), ledger.balance(1)] == [0.0, 70.0]
+    assert ledger.batches <= len(futures)
+
+
+@pytest.mark.parametrize("operation, error", [
+    (lambda ledger: ledger.withdraw("alice", 1), TypeError),
+    (lambda ledger: ledger.withdraw(-1, 5), IndexError),
+    (lambda ledger: ledger.transfer(0, 2, 5), IndexError),
+    (lambda ledger: ledger.withdraw(0, -50), ValueError),
+    (lambda ledger: ledger.withdraw(0, 0), ValueError),
+])
+def test_invalid_operations_fail_and_the_committer_goes_on(operation, error):
+    ledger = Ledger([100.0, 100.0], io_time=0)
+    with pytest.raises(error):
+        operation(ledger).result(timeout=1)
+    assert ledger.withdraw(1, 10).result(timeout=1) is True
+    ledger.close()
+    assert [ledger.balance(0), ledger.balance(1)] == [100.0, 90.0]
+
+
+def test_submit_after_close_raises():
+    ledger = Ledger([100.0], io_time=0)
+    ledger.close()
+    with pytest.raises(RuntimeError):
+        ledger.withdraw(0, 1)
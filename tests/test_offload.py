@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import threading
+
+from budwing.clean.concurrency.offload import offload, run_offloaded, shutdown_pools, sum_of_squares
+
+
+def test_process_offload_returns_the_result():
+    async def main():
+        return await asyncio.gather(sum_of_squares(0, 1000), sum_of_squares(start=1000, stop=2000))
+
+    try:
+        assert sum(asyncio.run(main())) == sum(i * i for i in range(2000))
+    finally:
+        shutdown_pools()
+
+
+def test_cancelled_call_waiting_for_a_slot_never_runs():
+    release, calls = threading.Event(), []
+
+    @offload(kind="thread", max_in_flight=1)
+    def blocking(n):
+        calls.append(n)
+        release.wait(5)
+        return n
+
+    async def main():
+        first = asyncio.create_task(blocking(1))
+        second = asyncio.create_task(blocking(2))
+        await asyncio.sleep(0.05)
+        second.cancel()
+        release.set()
+        assert await first == 1
+        assert second.cancelled()
+
+    try:
+        asyncio.run(main())
+        assert calls == [1]
+    finally:
+        shutdown_pools()
+
+
+def test_limit_works_across_event_loops():
+    @offload(kind="thread", max_in_flight=1)
+    def square(n):
+        return n * n
+
+    async def main():
+        return await asyncio.gather(*(square(n) for n in range(4)))
+
+    try:
+        assert asyncio.run(main()) == [0, 1, 4, 9]
+        assert asyncio.run(main()) == [0, 1, 4, 9]  # a new loop, the calls contend again
+    finally:
+        shutdown_pools()
+
+
+def _tagged(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return "decorated", func(*args, **kwargs)
+    return wrapper
+
+
+@_tagged
+def double(x):
+    return x * 2
+
+
+def test_process_mode_keeps_other_decorators():
+    async def main():
+        return await asyncio.gather(run_offloaded(double, 3), run_offloaded(double, 3, kind="thread"))
+
+    try:
+        assert asyncio.run(main()) == [("decorated", 6), ("decorated", 6)]
+    finally:
+        shutdown_pools()
@@ -0,0 +1,55 @@
+import os
+import threading
+
+import pytest
+
+from budwing.clean.concurrency.pattern.ordered_process_pool import cpu_bound_task, process_ordered
+
+
+def square(n):
+    return n * n
+
+
+def fail_on_7(n):
+    if n == 7:
+        raise ValueError("unlucky")
+    return n
+
+
+def make_lock(n):
+    return threading.Lock()
+
+
+def die(n):
+    os._exit(3)
+
+
+def test_results_come_back_in_input_order():
+    items = range(300)
+    assert list(process_ordered(items, cpu_bound_task, workers=3, chunksize=8)) == [cpu_bound_task(n) for n in items]
+    assert sorted(process_ordered(items, square, workers=3, chunksize=8, ordered=False)) == [n * n for n in items]
+
+
+def test_window_bounds_the_items_taken_ahead():
+    pulled = 0
+
+    def source():
+        nonlocal pulled
+        for n in range(500):
+            pulled += 1
+            yield n
+
+    chunksize, window = 4, 3
+    for k, result in enumerate(process_ordered(source(), square, workers=2, chunksize=chunksize, window=window)):
+        assert result == k * k
+        assert pulled <= (k // chunksize + window) * chunksize
+
+
+@pytest.mark.parametrize("func, error", [
+    (fail_on_7, ValueError),
+    (make_lock, TypeError),  # the result can't be pickled
+    (die, RuntimeError),  # the consumer process is gone
+])
+def test_errors_are_raised_instead_of_hanging(func, error):
+    with pytest.raises(error):
+        list(process_ordered(range(20), func, workers=2, chunksize=4))
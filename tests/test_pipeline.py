@@ -0,0 +1,43 @@
+import pytest
+
+from budwing.clean.concurrency.pattern.pipeline import Pipeline
+
+
+def test_pipeline_runs_every_item_through_every_stage():
+    pipeline = (
+        Pipeline()
+        .add_stage("double", lambda x: x * 2, workers=3, maxsize=2)
+        .add_stage("increment", lambda x: x + 1, workers=2, maxsize=2)
+    )
+
+    results = pipeline.run(range(100))
+
+    assert sorted(results) == [x * 2 + 1 for x in range(100)]
+    assert [s["processed"] for s in pipeline.stats()] == [100, 100]
+
+
+def test_pipeline_propagates_the_first_error():
+    def fail_on_13(x):
+        if x == 13:
+            raise ValueError("unlucky")
+        return x
+
+    pipeline = Pipeline().add_stage("check", fail_on_13, workers=2, maxsize=1).add_stage("id", lambda x: x)
+
+    with pytest.raises(ValueError, match="unlucky"):
+        pipeline.run(range(1000))
+
+
+def test_pipeline_can_run_again_after_a_failure():
+    def fail_on_13(x):
+        if x == 13:
+            raise ValueError("unlucky")
+        return x
+
+    pipeline = Pipeline().add_stage("check", fail_on_13, workers=2, maxsize=1).add_stage("id", lambda x: x)
+
+    with pytest.raises(ValueError):
+        pipeline.run(range(100))
+    assert sorted(pipeline.run(range(10))) == list(range(10))
+    assert sorted(pipeline.run(range(10, 13))) == [10, 11, 12]
+    assert [s["processed"] for s in pipeline.stats()] == [3, 3]
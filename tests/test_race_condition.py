@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from budwing.clean.concurrency.backoff import ExponentialBackoff
+from budwing.clean.concurrency.race_condition import RaceCondition, User, user_locks
+
+
+def test_locked_writes_are_seen_by_compare_and_set():
+    alice = User("Alice", 100.0)
+    _, version = alice.get_versioned_balance()
+    assert RaceCondition().withdraw(alice, 30.0, io_time=0) is True
+    assert alice.compare_and_set(version, 0.0) is False
+    alice.set_balance(50.0)
+    assert alice.get_versioned_balance() == (50.0, version + 2)
+
+
+def test_locked_and_optimistic_withdrawals_lose_no_update():
+    r = RaceCondition()
+    alice = User("Alice", 100.0)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(r.withdraw(alice, 30.0, io_time=0.05))),
+        threading.Thread(target=lambda: results.append(r.withdraw_optimistic(alice, 30.0, io_time=0.05))),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True, True]
+    assert alice.get_balance() == 40.0
+    assert r.withdraw(alice, 50.0, io_time=0) is False
+
+
+def test_optimistic_backoff_is_capped_and_skipped_after_the_last_attempt():
+    delays = []
+
+    class RecordingBackoff(ExponentialBackoff):
+        def delay(self, attempt):
+            delays.append(super().delay(attempt))
+            return 0
+
+    class AlwaysConflicting(User):
+        def compare_and_set(self, expected_version, balance):
+            return False
+
+    user = AlwaysConflicting("Alice", 100.0)
+    backoff = RecordingBackoff(base=0.1, cap=1.0)
+    assert RaceCondition().withdraw_optimistic(user, 30.0, io_time=0, max_retries=20, backoff=backoff) is False
+    assert len(delays) == 20  # no sleep after the 21st, final attempt
+    assert max(delays) <= 1.0
+
+
+def test_withdraw_async_does_not_take_the_thread_lock():
+    alice = User("Alice", 100.0)
+    locked, release = threading.Event(), threading.Event()
+
+    def threaded_withdrawal():  # holds Alice's thread lock across its slow work
+        with user_locks.lock("Alice"):
+            locked.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=threaded_withdrawal)
+    holder.start()
+    locked.wait()
+    start = time.perf_counter()
+    asyncio.run(RaceCondition().withdraw_async(alice, 30.0))
+    elapsed = time.perf_counter() - start
+    release.set()
+    holder.join()
+    assert elapsed < 1
+    assert alice.get_balance() == 70.0
@@ -0,0 +1,50 @@
+import pytest
+
+from budwing.clean.concurrency.sharded_ledger import ShardedLedger
+
+
+def test_cross_shard_transfer_and_compensation():
+    ledger = ShardedLedger([100.0, 100.0, 100.0], shards=2, io_time=0)
+    assert ledger.transfer(0, 1, 30).result() is True  # shard 0 -> shard 1
+    assert ledger.transfer(1, 0, 500).result() is False  # insufficient funds
+    with pytest.raises(IndexError):
+        ledger.transfer(2, 5, 10).result()  # there is no account 5
+    ledger.close()
+    assert [ledger.balance(n) for n in range(3)] == [70.0, 130.0, 100.0]
+
+
+@pytest.mark.parametrize("source, target, amount, error", [
+    (0, None, 10, TypeError),
+    ("0", 1, 10, TypeError),
+    (0, -1, 10, IndexError),
+    (2, 1, 10, IndexError),
+    (0, 1, -10, ValueError),
+    (0, 1, "10", TypeError),
+])
+def test_invalid_transfers_are_rejected_before_any_debit(source, target, amount, error):
+    ledger = ShardedLedger([100.0, 100.0], shards=2, io_time=0)
+    with pytest.raises(error):
+        ledger.transfer(source, target, amount).result(timeout=1)
+    assert ledger.transfer(0, 1, 10).result(timeout=1) is True  # the shards are still alive
+    ledger.close()
+    assert [ledger.balance(0), ledger.balance(1)] == [90.0, 110.0]
+
+
+def test_failed_credit_is_refunded():
+    ledger = ShardedLedger([100.0, 100.0], shards=2, io_time=0)
+
+    def broken_credit(shard, transfer):
+        raise RuntimeError("target shard's database is down")
+
+    ledger._credit = broken_credit
+    with pytest.raises(RuntimeError):
+        ledger.transfer(0, 1, 30).result(timeout=1)
+    ledger.close()
+    assert [ledger.balance(0), ledger.balance(1)] == [100.0, 100.0]
+
+
+def test_transfer_after_close_is_rejected():
+    ledger = ShardedLedger([100.0, 100.0], shards=2, io_time=0)
+    ledger.close()
+    with pytest.raises(RuntimeError):
+        ledger.transfer(0, 1, 10)
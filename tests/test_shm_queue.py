@@ -0,0 +1,28 @@
+import queue
+
+import pytest
+
+from budwing.clean.concurrency.pattern.shm_queue import SharedRingQueue
+
+
+def test_records_wrap_around_the_ring():
+    q = SharedRingQueue(capacity=64)
+    try:
+        for i in range(20):
+            q.put_many([b"abcdefghij", ("item", i)])
+            assert q.get_many(10) == [b"abcdefghij", ("item", i)]
+    finally:
+        q.close()
+
+
+def test_full_and_empty_raise_like_multiprocessing_queue():
+    q = SharedRingQueue(capacity=32)
+    try:
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.01)
+        q.put(b"x" * 20)
+        with pytest.raises(queue.Full):
+            q.put(b"y" * 20, timeout=0.01)
+        assert q.get() == b"x" * 20
+    finally:
+        q.close()
@@ -0,0 +1,52 @@
+import queue
+import threading
+
+import pytest
+
+from budwing.clean.concurrency.pattern.spill_queue import SpillQueue
+
+
+def test_fifo_order_across_memory_and_disk(tmp_path):
+    q = SpillQueue(memory_limit=3, directory=str(tmp_path), segment_size=64)
+    try:
+        for i in range(10):
+            q.put(i)
+        assert q.spilled == 7
+        assert [q.get() for _ in range(5)] == [0, 1, 2, 3, 4]
+
+        q.put(10)  # the disk is not drained yet, so this one spills too
+        assert [q.get() for _ in range(6)] == [5, 6, 7, 8, 9, 10]
+        assert q.segments_removed > 0
+        assert list(tmp_path.iterdir()) == []
+
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.01)
+    finally:
+        q.close()
+
+
+def test_join_waits_for_task_done(tmp_path):
+    q = SpillQueue(memory_limit=2, directory=str(tmp_path), segment_size=64)
+    seen = []
+
+    def consumer():
+        while True:
+            try:
+                item = q.get(timeout=0.5)
+            except queue.Empty:
+                return
+            seen.append(item)
+            q.task_done()
+
+    try:
+        for i in range(6):
+            q.put(i, block=True, timeout=1)
+        t = threading.Thread(target=consumer)
+        t.start()
+        q.join()
+        assert seen == list(range(6))
+        with pytest.raises(ValueError):
+            q.task_done()
+        t.join()
+    finally:
+        q.close()
@@ -0,0 +1,39 @@
+import json
+import time
+
+from budwing.clean.concurrency.pattern.streaming_checker import stream_check
+
+
+def fake_fetch(url):
+    # the first url is the slowest, so results complete out of order
+    time.sleep(0.02 if url.endswith("/0") else 0.001)
+    return {"url": url, "status": 200, "error": None}
+
+
+def test_stream_check_writes_every_url(tmp_path):
+    out = tmp_path / "out.jsonl"
+    checkpoint = tmp_path / "checkpoint"
+    urls = [f"http://host/{i}" for i in range(50)] + [""]
+
+    written = stream_check(iter(urls), str(out), str(checkpoint),
+                           max_in_flight=4, window=8, fetch=fake_fetch)
+
+    results = [json.loads(line) for line in out.read_text().splitlines()]
+    assert written == 50
+    assert sorted(r["url"] for r in results) == sorted(urls[:-1])
+    assert checkpoint.read_text() == "51"
+
+
+def test_stream_check_resumes_from_checkpoint(tmp_path):
+    source = tmp_path / "urls.txt"
+    source.write_text("\n".join(f"http://host/{i}" for i in range(10)) + "\n")
+    out = tmp_path / "out.jsonl"
+    checkpoint = tmp_path / "checkpoint"
+    checkpoint.write_text("7")
+
+    written = stream_check(str(source), str(out), str(checkpoint), fetch=fake_fetch)
+
+    results = [json.loads(line) for line in out.read_text().splitlines()]
+    assert written == 3
+    assert sorted(r["url"] for r in results) == [f"http://host/{i}" for i in (7, 8, 9)]
+    assert checkpoint.read_text() == "10"
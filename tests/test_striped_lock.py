@@ -0,0 +1,59 @@
+import threading
+
+from budwing.clean.concurrency.dead_lock import User, transfer_many
+from budwing.clean.concurrency.striped_lock import StripedLocks
+
+
+def _finishes(target, timeout=5):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+def test_repeated_and_colliding_stripes_are_locked_once():
+    locks = StripedLocks(stripes=1)  # every key hashes to the same stripe
+
+    def lock_twice():
+        with locks.locked("alice", "alice", "bob"):
+            pass
+
+    assert _finishes(lock_twice)
+    assert locks._locks[0].acquire(blocking=False)  # released afterwards
+
+
+def test_locks_are_released_when_the_body_raises():
+    locks = StripedLocks(stripes=8)
+    try:
+        with locks.locked(1, 2, 3):
+            raise ValueError
+    except ValueError:
+        pass
+    assert all(lock.acquire(blocking=False) for lock in locks._locks)
+
+
+def test_transfer_many_is_all_or_nothing():
+    alice, bob, carol = User("Alice", 100), User("Bob", 10), User("Carol", 0)
+    # Bob can pay Carol only with the money Alice sends him first
+    assert transfer_many([(alice, bob, 50), (bob, carol, 60)])
+    assert (alice.balance, bob.balance, carol.balance) == (50, 0, 60)
+
+    assert not transfer_many([(carol, alice, 10), (alice, bob, 80)])
+    assert (alice.balance, bob.balance, carol.balance) == (50, 0, 60)
+
+
+def test_crossing_transfers_do_not_deadlock():
+    users = [User(name, 100) for name in ("Alice", "Bob", "Carol", "Dave")]
+    calls = [
+        [(users[0], users[1], 1), (users[2], users[3], 1)],
+        [(users[3], users[2], 1), (users[1], users[0], 1)],
+        [(users[1], users[3], 1), (users[2], users[0], 1)],
+        [(users[3], users[0], 1), (users[0], users[2], 1)],
+    ]
+    threads = [threading.Thread(target=transfer_many, args=(moves,), daemon=True) for moves in calls]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert not any(t.is_alive() for t in threads)
+    assert sum(user.balance for user in users) == 400
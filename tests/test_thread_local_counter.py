@@ -0,0 +1,47 @@
+import threading
+import time
+
+from budwing.clean.concurrency.thread_local_counter import ThreadLocalCounter
+
+
+def _run_threads(counter, threads_count, increments):
+    def work():
+        for _ in range(increments):
+            counter.increment()
+
+    threads = [threading.Thread(target=work) for _ in range(threads_count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def test_every_thread_counts_in_its_own_cell():
+    counter = ThreadLocalCounter()
+    _run_threads(counter, 4, 1000)
+    counter.increment(5)  # the main thread gets a cell too
+    assert len(counter._cells) == 5
+    assert counter.value() == 4005
+
+
+def test_dead_threads_are_still_counted_after_their_cells_are_dropped():
+    counter = ThreadLocalCounter()
+    _run_threads(counter, 8, 100)
+    assert counter.flush() == 800
+    assert counter._cells == []
+    _run_threads(counter, 8, 100)
+    assert counter.value() == 1600  # value() drops dead cells too
+    assert counter._cells == []
+
+
+def test_interval_flusher_updates_the_snapshot():
+    counter = ThreadLocalCounter(flush_interval=0.01)
+    try:
+        _run_threads(counter, 2, 50)
+        deadline = time.monotonic() + 2
+        while counter.snapshot() != 100 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert counter.snapshot() == 100
+    finally:
+        counter.close()
+    ThreadLocalCounter().close()  # no flusher, close() still works
@@ -0,0 +1,44 @@
+import threading
+import time
+
+import pytest
+
+from budwing.clean.concurrency.pattern.work_stealing import WorkStealingExecutor
+
+
+def test_task_spawned_by_a_task_goes_to_its_worker_deque():
+    release = threading.Event()
+    with WorkStealingExecutor(max_workers=2) as executor:
+        blocker = executor.submit(release.wait, 5)  # keeps the other worker busy
+
+        def parent():
+            index = executor._local.index
+            child = executor.submit(lambda: "child")
+            queued_locally = len(executor._deques[index]) == 1
+            release.set()
+            return queued_locally, child
+
+        queued_locally, child = executor.submit(parent).result(timeout=5)
+        assert queued_locally
+        assert child.result(timeout=5) == "child"
+        assert blocker.result(timeout=5)
+
+
+def test_idle_workers_steal_spawned_work():
+    with WorkStealingExecutor(max_workers=4) as executor:
+        def parent():
+            return [executor.submit(time.sleep, 0.01) for _ in range(40)]
+
+        children = executor.submit(parent).result(timeout=5)
+        for child in children:
+            child.result(timeout=5)
+        assert sum(executor.steals) > 0
+
+
+def test_shutdown_drains_submitted_tasks_then_rejects_new_ones():
+    executor = WorkStealingExecutor(max_workers=3)
+    futures = [executor.submit(time.sleep, 0.001) for _ in range(60)]
+    executor.shutdown(wait=True)
+    assert all(f.done() for f in futures)
+    with pytest.raises(RuntimeError):
+        executor.submit(print)